@@ -0,0 +1,53 @@
+"""
+Times HandEvaluator.eval_hand against the eval_hand of another revision on the
+same seeded random 7-card hands (best of several runs), after checking that
+both give the same scores.
+
+Usage: python benchmark_hand_evaluator.py [baseline_rev] [nb_hand] [nb_repeat]
+"""
+import random
+import subprocess
+import sys
+import timeit
+import types
+
+from pypokerengine.engine.card import Card
+from pypokerengine.engine.hand_evaluator import HandEvaluator
+
+EVALUATOR_PATH = "pypokerengine/engine/hand_evaluator.py"
+
+def load_evaluator(rev):
+    source = subprocess.check_output(["git", "show", "%s:%s" % (rev, EVALUATOR_PATH)])
+    module = types.ModuleType("baseline_hand_evaluator")
+    exec(compile(source, "%s:%s" % (rev, EVALUATOR_PATH), "exec"), module.__dict__)
+    return module.HandEvaluator
+
+def gen_hands(nb_hand, seed=0):
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(nb_hand):
+        card_ids = rng.sample(range(1, 53), 7)
+        cards = [Card.from_id(card_id) for card_id in card_ids]
+        hands.append((cards[:2], cards[2:]))
+    return hands
+
+def best_time(eval_hand, hands, nb_repeat):
+    def run():
+        for hole, community in hands:
+            eval_hand(hole, community)
+    return min(timeit.repeat(run, number=1, repeat=nb_repeat))
+
+def main(baseline_rev, nb_hand, nb_repeat):
+    baseline = load_evaluator(baseline_rev)
+    hands = gen_hands(nb_hand)
+    for hole, community in hands:
+        assert baseline.eval_hand(hole, community) == HandEvaluator.eval_hand(hole, community)
+    baseline_time = best_time(baseline.eval_hand, hands, nb_repeat)
+    current_time = best_time(HandEvaluator.eval_hand, hands, nb_repeat)
+    print("%d hands: %s %.3fs, current %.3fs, speedup %.1fx" %\
+            (nb_hand, baseline_rev, baseline_time, current_time, baseline_time / current_time))
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(args[0] if len(args) > 0 else "HEAD",
+            int(args[1]) if len(args) > 1 else 50000, int(args[2]) if len(args) > 2 else 5)
@@ -0,0 +1,27 @@
+"""
+Generates pypokerengine/engine/hand_tables.npz: the straight, flush and rank
+lookup tables of HandEvaluator. Building the rank table in Python takes a few
+hundred milliseconds, so it is shipped precomputed and hand_evaluator only
+loads it at import. Rerun this after changing the scoring in hand_evaluator.
+
+Usage: python build_hand_tables.py
+"""
+import numpy as np
+
+from pypokerengine.engine import hand_evaluator
+from pypokerengine.engine.hand_evaluator import HAND_TABLES_PATH, _build_straight_table,\
+        _build_flush_table, _build_rank_table, _rank_table_arrays
+
+def main():
+    # the flush and rank builders score through HandEvaluator, which reads the
+    # module level straight table, so rebuild it first
+    hand_evaluator._STRAIGHT_TABLE = _build_straight_table()
+    rank_keys, rank_values = _rank_table_arrays(_build_rank_table())
+    np.savez_compressed(HAND_TABLES_PATH,
+            straight=np.array(hand_evaluator._STRAIGHT_TABLE, dtype=np.int64),
+            flush=np.array(_build_flush_table(), dtype=np.int64),
+            rank_keys=rank_keys, rank_values=rank_values)
+    print("wrote %s (%d rank keys)" % (HAND_TABLES_PATH, len(rank_keys)))
+
+if __name__ == "__main__":
+    main()
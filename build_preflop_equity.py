@@ -0,0 +1,55 @@
+"""
+Generates models/preflop_equity.json: the win rate (ties count as wins, as in
+estimate_hole_card_win_rate) of each of the 169 starting hand classes against
+1 to 9 random opponents. estimate_hole_card_win_rate reads it whenever there
+are no community cards.
+
+Usage: python build_preflop_equity.py [nb_simulation]
+"""
+import json
+import sys
+
+import numpy as np
+
+from pypokerengine.engine.card import Card
+from pypokerengine.engine.hand_evaluator import HandEvaluator
+from pypokerengine.utils.card_utils import PREFLOP_EQUITY_PATH, MONTECARLO_BATCH_SIZE,\
+        gen_preflop_hand_classes, _draw_unused_ids, _unused_card_ids
+
+MAX_PLAYER = 10
+
+def representative_hole(hand_class):
+    rank_of = {v: k for k, v in Card.RANK_MAP.items()}
+    high, low = rank_of[hand_class[0]], rank_of[hand_class[1]]
+    low_suit = Card.SPADE if hand_class.endswith("s") else Card.HEART
+    return [Card(Card.SPADE, high), Card(low_suit, low)]
+
+# Every sample deals MAX_PLAYER-1 opponents; the win rate against k opponents
+# is read off the first k of them, so all player counts share the same runouts.
+def win_counts(hole_ids, nb_simulation, rng):
+    unused_ids = _unused_card_ids(hole_ids)
+    counts = np.zeros(MAX_PLAYER-1, dtype=np.int64)
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        batch_size = min(MONTECARLO_BATCH_SIZE, nb_simulation - offset)
+        picked_ids = _draw_unused_ids(rng, batch_size, unused_ids, 5 + (MAX_PLAYER-1)*2)
+        boards = np.repeat(picked_ids[:, :5], MAX_PLAYER, axis=0)
+        hole = np.broadcast_to(np.array(hole_ids, dtype=np.intp), (batch_size, 2))
+        holes = np.hstack([hole, picked_ids[:, 5:]]).reshape(batch_size * MAX_PLAYER, 2)
+        scores = HandEvaluator.eval_hands_batch(holes, boards).reshape(batch_size, MAX_PLAYER)
+        best_opponent_scores = np.maximum.accumulate(scores[:, 1:], axis=1)
+        counts += np.count_nonzero(scores[:, :1] >= best_opponent_scores, axis=0)
+    return counts
+
+def main(nb_simulation):
+    rng = np.random.default_rng(0)
+    equity = {}
+    for hand_class in gen_preflop_hand_classes():
+        hole_ids = [card.to_id() for card in representative_hole(hand_class)]
+        counts = win_counts(hole_ids, nb_simulation, rng)
+        equity[hand_class] = [round(1.0 * int(count) / nb_simulation, 5) for count in counts]
+        print(hand_class, equity[hand_class][:3])
+    with open(PREFLOP_EQUITY_PATH, "w") as f:
+        json.dump({ "nb_simulation": nb_simulation, "equity": equity }, f, separators=(",", ":"))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -353,13 +353,11 @@ class PokerGame:
 
     def showdown(self):
         """Evaluate hands and determine winner at showdown"""
-        # Evaluate both hands - HandEvaluator expects hole cards and community cards separately
-        human_score = HandEvaluator.eval_hand(self.human_cards, self.community_cards)
-        ai_score = HandEvaluator.eval_hand(self.ai_cards, self.community_cards)
-
-        # Get hand info for detailed comparison
-        human_info = HandEvaluator.gen_hand_rank_info(self.human_cards, self.community_cards)
-        ai_info = HandEvaluator.gen_hand_rank_info(self.ai_cards, self.community_cards)
+        # Evaluate each hand once - the description carries both the score and the hand info
+        human_info = HandEvaluator.describe(self.human_cards, self.community_cards)
+        ai_info = HandEvaluator.describe(self.ai_cards, self.community_cards)
+        human_score = human_info['score']
+        ai_score = ai_info['score']
 
         # Check if same hand type
         same_hand_type = human_info['hand']['strength'] == ai_info['hand']['strength']
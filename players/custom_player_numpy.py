@@ -7,6 +7,11 @@ from pypokerengine.utils.card_utils import gen_cards, estimate_hole_card_win_rat
 import numpy as np
 import json
 import os
+import time
+
+# declare_action is cut off after 0.5s (the player then folds), so the equity
+# estimate only gets what is left of this budget when it starts
+DECISION_TIME_BUDGET_MS = 250
 
 class CustomPlayer(BasePokerPlayer):
 
@@ -42,7 +47,8 @@ class CustomPlayer(BasePokerPlayer):
 
     def declare_action(self, valid_actions, hole_card, round_state):
         # Extract features
-        state = self.extract_features(hole_card, round_state)
+        deadline = time.perf_counter() + DECISION_TIME_BUDGET_MS / 1000.0
+        state = self.extract_features(hole_card, round_state, deadline)
         state_array = np.array(state, dtype=np.float32)
 
         # Run forward pass
@@ -53,13 +59,16 @@ class CustomPlayer(BasePokerPlayer):
         action_index = min(action_index, len(valid_actions) - 1)
         return valid_actions[action_index]['action']
 
-    def extract_features(self, hole_card, round_state):
+    def extract_features(self, hole_card, round_state, deadline=None):
         community_card = round_state['community_card']
+        time_budget_ms = max(0, (deadline - time.perf_counter()) * 1000) if deadline else None
         win_rate = estimate_hole_card_win_rate(
             nb_simulation=1000,
             nb_player=2,
             hole_card=gen_cards(hole_card),
-            community_card=gen_cards(community_card)
+            community_card=gen_cards(community_card),
+            exact="auto",
+            time_budget_ms=time_budget_ms
         )
 
         my_stack = next(player['stack'] for player in round_state['seats']
@@ -34,7 +34,7 @@ class Emulator(object):
             raise TypeError("player must inherit %s class." % BasePokerPlayer)
         
         # Wrap the function with a timeout
-        default_action_info      = ("fold",0)  # Fold
+        default_action_info      = "fold"  # Fold
         player.declare_action = timeout2(0.5,default_action_info)(player.declare_action)
         
         self.players_holder[uuid] = player
@@ -60,7 +60,7 @@ class Emulator(object):
         players = game_state["table"].seats.players
         player_pos = game_state["next_player"]
         sb_amount = game_state["small_blind_amount"]
-        return ActionChecker.legal_actions(players, player_pos, sb_amount)
+        return ActionChecker.legal_actions(players, player_pos, sb_amount, game_state["street"])
 
     def apply_action(self, game_state, action, bet_amount=0):
         if game_state["street"] == Const.Street.FINISHED:
@@ -79,36 +79,38 @@ class Emulator(object):
             raise Exception("Failed to apply action. Because game is already finished.")
         return game_state, events
 
-    def run_until_round_finish(self, game_state):
+    # events=False skips building the per-action messages, only the game
+    # finish event is still returned.
+    def run_until_round_finish(self, game_state, events=True):
         mailbox = []
         while game_state["street"] != Const.Street.FINISHED:
             next_player_pos = game_state["next_player"]
             next_player_uuid = game_state["table"].seats.players[next_player_pos].uuid
             next_player_algorithm = self.fetch_player(next_player_uuid)
             msg = MessageBuilder.build_ask_message(next_player_pos, game_state)["message"]
-            action, amount = next_player_algorithm.declare_action(\
+            action = next_player_algorithm.declare_action(\
                     msg["valid_actions"], msg["hole_card"], msg["round_state"])
-            game_state, messages = RoundManager.apply_action(game_state, action, amount)
+            game_state, messages = RoundManager.apply_action(game_state, action, messages=events)
             mailbox += messages
-        events = [self.create_event(message[1]["message"]) for message in mailbox]
-        events = [e for e in events if e]
+        round_events = [self.create_event(message[1]["message"]) for message in mailbox]
+        round_events = [e for e in round_events if e]
         if self._is_last_round(game_state, self.game_rule):
-            events += self._generate_game_result_event(game_state)
-        return game_state, events
+            round_events += self._generate_game_result_event(game_state)
+        return game_state, round_events
 
-    def run_until_game_finish(self, game_state):
+    def run_until_game_finish(self, game_state, events=True):
         mailbox = []
         event_box= []
         if game_state["street"] != Const.Street.FINISHED:
-            game_state, events = self.run_until_round_finish(game_state)
-            event_box += events
+            game_state, round_events = self.run_until_round_finish(game_state, events)
+            event_box += round_events
         while True:
-            game_state, events = self.start_new_round(game_state)
-            event_box += events
-            if Event.GAME_FINISH == events[-1]["type"]: break
-            game_state, events = self.run_until_round_finish(game_state)
-            event_box += events
-            if Event.GAME_FINISH == events[-1]["type"]: break
+            game_state, round_events = self.start_new_round(game_state)
+            event_box += round_events
+            if Event.GAME_FINISH == round_events[-1]["type"]: break
+            game_state, round_events = self.run_until_round_finish(game_state, events)
+            event_box += round_events
+            if round_events and Event.GAME_FINISH == round_events[-1]["type"]: break
         event_box = [e for e in event_box if e]
         return game_state, event_box
 
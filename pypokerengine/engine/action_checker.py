@@ -1,5 +1,3 @@
-from functools import reduce
-
 class ActionChecker:
 
   @classmethod
@@ -29,7 +27,7 @@ class ActionChecker:
   @classmethod
   def agree_amount(self, players):
     last_raise = self.__fetch_last_raise(players)
-    return last_raise["amount"] if last_raise else 0
+    return last_raise[0] if last_raise else 0
 
 
   @classmethod
@@ -75,21 +73,23 @@ class ActionChecker:
   @classmethod
   def __min_raise_amount(self, players, sb_amount):
     raise_ = self.__fetch_last_raise(players)
-    return raise_["amount"] + raise_["add_amount"] if raise_ else sb_amount*2
+    return raise_[0] + raise_[1] if raise_ else sb_amount*2
 
   @classmethod
   def __is_short_of_money(self, player, amount):
     return player.stack < amount - player.paid_sum()
 
+  # (amount, add_amount) of the highest raise of the street, from the betting
+  # state each player keeps (see Player.street_raise). Ties keep the first
+  # player like a max() scan.
   @classmethod
   def __fetch_last_raise(self, players):
-    all_histories = [p.action_histories for p in players]
-    all_histories = reduce(lambda acc, e: acc + e, all_histories)  # flatten
-    raise_histories = [h for h in all_histories if h["action"] in ["RAISE", "SMALLBLIND", "BIGBLIND"]]
-    if len(raise_histories) == 0:
-      return None
-    else:
-      return max(raise_histories, key=lambda h: h["amount"])  # maxby
+    last_raise = None
+    for player in players:
+      raise_ = player.street_raise
+      if raise_ and (last_raise is None or raise_[0] > last_raise[0]):
+        last_raise = raise_
+    return last_raise
 
   @classmethod
   def round_raise_amount(self, sb_amount,street):
@@ -100,13 +100,4 @@ class ActionChecker:
 
   @classmethod
   def __player_raise_number(self,players,player_pos,street):
-    raised_number = 0
-    histories = players[player_pos].round_action_histories
-    for rounds in histories:
-      if rounds == None:
-        return raised_number
-      else:
-        for action in rounds:
-          if action["action"] == "RAISE":
-            raised_number += 1
-    return raised_number
\ No newline at end of file
+    return players[player_pos].past_raise_number
\ No newline at end of file
@@ -1,5 +1,9 @@
 class Card:
 
+  # The 52 cards are interned: Card(suit, rank), from_id and from_str all
+  # return the same instance for the same card, with its id and str precomputed.
+  __slots__ = ("suit", "rank", "_id", "_str")
+
   CLUB = 2
   DIAMOND = 4
   HEART = 8
@@ -29,19 +33,42 @@ class Card:
   }
 
 
-  def __init__(self, suit, rank):
-    self.suit = suit
-    self.rank = 14 if rank == 1 else rank
+  def __new__(cls, suit, rank):
+    rank = 14 if rank == 1 else rank
+    card = _CARDS_BY_SUIT_RANK.get((suit, rank))
+    if card is None:
+      card = object.__new__(cls)
+      card.suit, card.rank = suit, rank
+      card._id = card.__calc_id()
+      card._str = "{0}{1}".format(cls.SUIT_MAP[suit], cls.RANK_MAP[rank])
+    return card
 
   def __eq__(self, other):
-    return self.suit == other.suit and self.rank == other.rank
+    return self is other or (self.suit == other.suit and self.rank == other.rank)
+
+  def __hash__(self):
+    return self._id
 
   def __str__(self):
-    suit = self.SUIT_MAP[self.suit]
-    rank = self.RANK_MAP[self.rank]
-    return "{0}{1}".format(suit, rank)
+    return self._str
+
+  # copies and pickles resolve to the interned card
+  def __reduce__(self):
+    return (Card.from_id, (self._id,))
 
   def to_id(self):
+    return self._id
+
+  @classmethod
+  def from_id(cls, card_id):
+    return _CARDS_BY_ID[card_id]
+
+  @classmethod
+  def from_str(cls, str_card):
+    assert(len(str_card)==2)
+    return _CARDS_BY_STR[str_card[0].upper() + str_card[1]]
+
+  def __calc_id(self):
     rank = 1 if self.rank == 14 else self.rank
     num = 0
     tmp = self.suit >> 1
@@ -51,20 +78,20 @@ class Card:
 
     return rank + 13 * num
 
-  @classmethod
-  def from_id(cls, card_id):
+
+def _build_card_tables():
+  by_suit_rank, by_id = {}, [None] * 53
+  for card_id in range(1, 53):
     suit, rank = 2, card_id
     while rank > 13:
       suit <<= 1
       rank -= 13
+    card = Card(suit, rank)
+    by_suit_rank[(card.suit, card.rank)] = card
+    by_id[card_id] = card
+  return by_suit_rank, by_id
 
-    return cls(suit, rank)
-
-  @classmethod
-  def from_str(cls, str_card):
-    assert(len(str_card)==2)
-    inverse = lambda hsh: {v:k for k,v in hsh.items()}
-    suit = inverse(cls.SUIT_MAP)[str_card[0].upper()]
-    rank = inverse(cls.RANK_MAP)[str_card[1]]
-    return cls(suit, rank)
-
+# Card() looks cards up here, so it starts empty while the tables are built
+_CARDS_BY_SUIT_RANK = {}
+_CARDS_BY_SUIT_RANK, _CARDS_BY_ID = _build_card_tables()
+_CARDS_BY_STR = { str(card): card for card in _CARDS_BY_ID[1:] }
@@ -79,7 +79,8 @@ class DataEncoder:
 
   @classmethod
   def encode_action_histories(self, table):
-    all_street_histories = [[player.round_action_histories[street] for player in table.seats.players] for street in range(4)]
+    round_histories = [player.round_action_histories for player in table.seats.players]
+    all_street_histories = [[histories[street] for histories in round_histories] for street in range(4)]
     past_street_histories = [histories for histories in all_street_histories if any([e is not None for e in histories])]
     current_street_histories = [player.action_histories for player in table.seats.players]
     street_histories = past_street_histories + [current_street_histories]
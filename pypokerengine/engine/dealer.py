@@ -18,6 +18,7 @@ class Dealer:
     self.message_summarizer = MessageSummarizer(verbose=0)
     self.table = Table()
     self.blind_structure = {}
+    self.notification = True
 
   def register_player(self, player_name, algorithm):
     self.__config_check()
@@ -28,6 +29,11 @@ class Dealer:
   def set_verbose(self, verbose):
       self.message_summarizer.verbose = verbose
 
+  # notify=False skips the round notifications, players only receive the ask
+  # messages (and the game start message). For bulk simulations.
+  def set_notification(self, notify):
+    self.notification = notify
+
   def start_game(self, max_round):
     table = self.table
     self.__notify_game_start(max_round)
@@ -41,6 +47,8 @@ class Dealer:
     return self.__generate_game_result(max_round, table.seats)
   
   def play_round(self, round_count, blind_amount, ante, table):
+    if not self.notification:
+      return self.__play_round_without_notification(round_count, blind_amount, ante, table)
     state, msgs = RoundManager.start_new_round(round_count, blind_amount, ante, table)
     while True:
       #TODO:update the play_round
@@ -53,6 +61,15 @@ class Dealer:
         break
     return state["table"]
 
+  def __play_round_without_notification(self, round_count, blind_amount, ante, table):
+    state, _ = RoundManager.start_new_round(round_count, blind_amount, ante, table, messages=False)
+    while state["street"] != Const.Street.FINISHED:
+      next_player_pos = state["next_player"]
+      next_player_uuid = state["table"].seats.players[next_player_pos].uuid
+      ask_msg = MessageBuilder.build_ask_message(next_player_pos, state)
+      action = self.message_handler.process_message(next_player_uuid, ask_msg)
+      state, _ = RoundManager.apply_action(state, action, messages=False)
+    return state["table"]
 
   def set_small_blind_amount(self, amount):
     self.small_blind_amount = amount
@@ -1,20 +1,24 @@
-from functools import reduce
-
 from pypokerengine.engine.card import Card
 import random
 
 class Deck:
 
+  # self.deck holds the card ids (see Card.to_id) as a bytearray, cards are
+  # drawn from its end.
   def __init__(self, deck_ids=None, cheat=False, cheat_card_ids=[]):
     self.cheat = cheat
     self.cheat_card_ids = cheat_card_ids
-    self.deck = [Card.from_id(cid) for cid in deck_ids] if deck_ids else self.__setup()
+    self.deck = bytearray(deck_ids) if deck_ids else self.__setup()
 
   def draw_card(self):
-    return self.deck.pop()
+    return Card.from_id(self.deck.pop())
 
   def draw_cards(self, num):
-    return reduce(lambda acc, _: acc + [self.draw_card()], range(num), [])
+    if num > len(self.deck):
+      raise IndexError("draw from empty deck")
+    drawn = self.deck[len(self.deck)-num:]
+    del self.deck[len(self.deck)-num:]
+    return [Card.from_id(card_id) for card_id in reversed(drawn)]
 
   def size(self):
     return len(self.deck)
@@ -22,13 +26,22 @@ class Deck:
   def restore(self):
     self.deck = self.__setup()
 
+  # In-place Fisher-Yates over the id array (random.shuffle, so a seeded
+  # random module deals the same cards as before)
   def shuffle(self):
     if not self.cheat:
       random.shuffle(self.deck)
 
+  def copy(self):
+    deck = Deck.__new__(Deck)
+    deck.cheat = self.cheat
+    deck.cheat_card_ids = self.cheat_card_ids
+    deck.deck = bytearray(self.deck)
+    return deck
+
   # serialize format : [cheat_flg, chat_card_ids, deck_card_ids]
   def serialize(self):
-    return [self.cheat, self.cheat_card_ids, [card.to_id() for card in self.deck]]
+    return [self.cheat, self.cheat_card_ids, list(self.deck)]
 
   @classmethod
   def deserialize(self, serial):
@@ -39,9 +52,7 @@ class Deck:
     return self.__setup_cheat_deck() if self.cheat else self.__setup_52_cards()
 
   def __setup_52_cards(self):
-    return [Card.from_id(cid) for cid in range(1,53)]
+    return bytearray(range(1, 53))
 
   def __setup_cheat_deck(self):
-    cards = [Card.from_id(cid) for cid in self.cheat_card_ids]
-    return cards[::-1]
-
+    return bytearray(self.cheat_card_ids[::-1])
@@ -1,108 +1,82 @@
-from functools import reduce
-from itertools import groupby
-
-from pypokerengine.engine.hand_evaluator import HandEvaluator
+from pypokerengine.engine.hand_evaluator import HandEvaluator, BoardEvaluator
 from pypokerengine.engine.pay_info import PayInfo
 
 class GameEvaluator:
 
+  # Each active player's hand is evaluated exactly once per judge, winners of
+  # the round and of every pot are picked from the same scores (by seat pos).
   @classmethod
   def judge(self, table):
-    winners = self.__find_winners_from(table.get_community_card(), table.seats.players)
-    hand_info = self.__gen_hand_info_if_needed(table.seats.players, table.get_community_card())
-    prize_map = self.__calc_prize_distribution(table.get_community_card(), table.seats.players)
+    players = table.seats.players
+    descriptions = self.__describe_active_players(table.get_community_card(), players)
+    scores = { pos: description["score"] for pos, description in descriptions.items() }
+    winners = [players[pos] for pos in self.__find_winners_from(scores, range(len(players)))]
+    hand_info = self.__gen_hand_info_if_needed(descriptions, players)
+    prize_map = self.__calc_prize_distribution(scores, players)
     return winners, hand_info, prize_map
 
   @classmethod
   def create_pot(self, players):
-    side_pots = self.__get_side_pots(players)
-    main_pot = self.__get_main_pot(players, side_pots)
-    return side_pots + [main_pot]
+    gen_pot = lambda amount, eligibles: \
+        { "amount": amount, "eligibles": [players[pos] for pos in eligibles] }
+    return [gen_pot(amount, eligibles) for amount, eligibles in self.__create_pot_positions(players)]
 
 
   @classmethod
-  def __calc_prize_distribution(self, community_card, players):
-    prize_map = self.__create_prize_map(len(players))
-    pots = self.create_pot(players)
-    for pot in pots:
-      winners = self.__find_winners_from(community_card, pot["eligibles"])
-      prize = int(pot["amount"] / len(winners))
-      for winner in winners:
-        prize_map[players.index(winner)] += prize
+  def __calc_prize_distribution(self, scores, players):
+    prize_map = { pos: 0 for pos in range(len(players)) }
+    for amount, eligibles in self.__create_pot_positions(players):
+      winners = self.__find_winners_from(scores, eligibles)
+      prize = int(amount / len(winners))
+      for pos in winners:
+        prize_map[pos] += prize
     return prize_map
 
+  # The community is accumulated once in a BoardEvaluator and every active
+  # hole is scored against it by card id.
   @classmethod
-  def __create_prize_map(self, player_num):
-    def update(d, other): d.update(other); return d
-    return reduce(update, [{i:0} for i in range(player_num)], {})
-
-  @classmethod
-  def __find_winners_from(self, community_card, players):
-    score_player = lambda player: HandEvaluator.eval_hand(player.hole_card, community_card)
-
-    active_players = [player for player in players if player.is_active()]
-    scores = [score_player(player) for player in active_players]
-    best_score = max(scores)
-    score_with_players = [(score, player) for score, player in zip(scores, active_players)]
-    winners = [s_p[1] for s_p in score_with_players if s_p[0] == best_score]
-    return winners
-
-  @classmethod
-  def __gen_hand_info_if_needed(self, players, community):
-    active_players = [player for player in players if player.is_active()]
-    gen_hand_info = lambda player: { "uuid": player.uuid, "hand" : HandEvaluator.gen_hand_rank_info(player.hole_card, community) }
-    return [] if len(active_players) == 1 else [gen_hand_info(player) for player in active_players]
-
-  @classmethod
-  def __get_main_pot(self, players, sidepots):
-    max_pay = max([pay.amount for pay in self.__get_payinfo(players)])
-    return {
-        "amount": self.__get_players_pay_sum(players) - self.__get_sidepots_sum(sidepots),
-        "eligibles": [player for player in players if player.pay_info.amount == max_pay]
-    }
+  def __describe_active_players(self, community_card, players):
+    board = BoardEvaluator(community_card)
+    describe = lambda hole: HandEvaluator.describe(hole, community_card, board.eval_hand(hole))
+    return { pos: describe(player.hole_card) for pos, player in enumerate(players) if player.is_active() }
 
   @classmethod
-  def __get_players_pay_sum(self, players):
-    return sum([pay.amount for pay in self.__get_payinfo(players)])
+  def __find_winners_from(self, scores, positions):
+    contenders = [pos for pos in positions if pos in scores]
+    best_score = max([scores[pos] for pos in contenders])
+    return [pos for pos in contenders if scores[pos] == best_score]
 
   @classmethod
-  def __get_side_pots(self, players):
-    pay_amounts = [payinfo.amount for payinfo in self.__fetch_allin_payinfo(players)]
-    gen_sidepots = lambda sidepots, allin_amount: sidepots + [self.__create_sidepot(players, sidepots, allin_amount)]
-    return reduce(gen_sidepots, pay_amounts, [])
+  def __gen_hand_info_if_needed(self, descriptions, players):
+    gen_hand = lambda description: { "hand": description["hand"], "hole": description["hole"] }
+    gen_hand_info = lambda pos: { "uuid": players[pos].uuid, "hand" : gen_hand(descriptions[pos]) }
+    return [] if len(descriptions) == 1 else [gen_hand_info(pos) for pos in descriptions]
 
+  # Side pots (one per all-in player, smallest first) followed by the main pot
+  # as (amount, eligible seat positions). Contributions are sorted once and the
+  # chips below each all-in amount are accumulated while walking them.
   @classmethod
-  def __create_sidepot(self, players, smaller_side_pots, allin_amount):
-    return {
-        "amount": self.__calc_sidepot_size(players, smaller_side_pots, allin_amount),
-        "eligibles" : self.__select_eligibles(players, allin_amount)
-    }
-
-  @classmethod
-  def __calc_sidepot_size(self, players, smaller_side_pots, allin_amount):
-    add_chip_for_pot = lambda pot, player: pot + min(allin_amount, player.pay_info.amount)
-    target_pot_size = reduce(add_chip_for_pot, players, 0)
-    return target_pot_size - self.__get_sidepots_sum(smaller_side_pots)
-
-  @classmethod
-  def __get_sidepots_sum(self, sidepots):
-    return reduce(lambda sum_, sidepot: sum_ + sidepot["amount"], sidepots, 0)
+  def __create_pot_positions(self, players):
+    pays = [player.pay_info.amount for player in players]
+    order = sorted(range(len(players)), key=lambda pos: pays[pos])
+    allin_amounts = [pays[pos] for pos in order if players[pos].pay_info.status == PayInfo.ALLIN]
+    pots, pots_sum, below_sum, idx = [], 0, 0, 0
+    for allin_amount in allin_amounts:
+      while pays[order[idx]] < allin_amount:
+        below_sum += pays[order[idx]]
+        idx += 1
+      target_pot_size = below_sum + allin_amount * (len(order) - idx)
+      pots.append((target_pot_size - pots_sum, self.__select_eligibles(players, allin_amount)))
+      pots_sum = target_pot_size
+    max_pay = max(pays)
+    main_eligibles = [pos for pos in range(len(players)) if pays[pos] == max_pay]
+    return pots + [(sum(pays) - pots_sum, main_eligibles)]
 
   @classmethod
   def __select_eligibles(self, players, allin_amount):
-    return [player for player in players if self.__is_eligible(player, allin_amount)]
+    return [pos for pos, player in enumerate(players) if self.__is_eligible(player, allin_amount)]
 
   @classmethod
   def __is_eligible(self, player, allin_amount):
     return player.pay_info.amount >= allin_amount and \
         player.pay_info.status != PayInfo.FOLDED
-
-  @classmethod
-  def __fetch_allin_payinfo(self, players):
-    payinfo = self.__get_payinfo(players)
-    allin_info = [info for info in payinfo if info.status == PayInfo.ALLIN]
-    return sorted(allin_info, key=lambda info: info.amount)
-
-  @classmethod
-  def __get_payinfo(self, players):
-    return [player.pay_info for player in players]
@@ -1,5 +1,10 @@
-from functools import reduce
-from itertools import groupby
+import os
+
+import numpy as np
+
+# Precomputed _STRAIGHT_TABLE, _FLUSH_TABLE and _RANK_TABLE, written by
+# build_hand_tables.py (they are rebuilt at import when the file is missing).
+HAND_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hand_tables.npz")
 
 class HandEvaluator:
 
@@ -27,7 +32,22 @@ class HandEvaluator:
 
   @classmethod
   def gen_hand_rank_info(self, hole, community):
-    hand = self.eval_hand(hole, community)
+    return self.__gen_hand_rank_info(self.eval_hand(hole, community))
+
+  # Evaluate the hand once and return everything derived from the score
+  # together: the score itself, the gen_hand_rank_info fields and the kicker
+  # ranks (descending) which complete the best five-card hand. Pass hand when
+  # the score is already known (e.g. from a BoardEvaluator of the community).
+  @classmethod
+  def describe(self, hole, community, hand=None):
+    hand = self.eval_hand(hole, community) if hand is None else hand
+    description = self.__gen_hand_rank_info(hand)
+    description["score"] = hand
+    description["kickers"] = self.__calc_kickers(hand, hole + community)
+    return description
+
+  @classmethod
+  def __gen_hand_rank_info(self, hand):
     row_strength = self.__mask_hand_strength(hand)
     strength = self.HAND_STRENGTH_MAP[row_strength]
     hand_high = self.__mask_hand_high_rank(hand)
@@ -47,11 +67,87 @@ class HandEvaluator:
         }
     }
 
+  @classmethod
+  def __calc_kickers(self, hand, cards):
+    row_strength = self.__mask_hand_strength(hand)
+    if row_strength in [self.STRAIGHT, self.FULLHOUSE, self.STRAIGHTFLASH]:
+      return []
+    if row_strength == self.FLASH:
+      suits = [card.suit for card in cards]
+      flash_suit = next(suit for suit in suits if suits.count(suit) >= 5)
+      flash_ranks = sorted([card.rank for card in cards if card.suit == flash_suit], reverse=True)
+      return flash_ranks[1:5]
+    made_ranks = {
+        self.HIGHCARD: [],
+        self.ONEPAIR: [self.__mask_hand_high_rank(hand)],
+        self.TWOPAIR: [self.__mask_hand_high_rank(hand), self.__mask_hand_low_rank(hand)],
+        self.THREECARD: [self.__mask_hand_high_rank(hand)],
+        self.FOURCARD: [self.__mask_hand_high_rank(hand)]
+    }[row_strength]
+    made_card_num = len([card for card in cards if card.rank in made_ranks])
+    rest_ranks = sorted([card.rank for card in cards if card.rank not in made_ranks], reverse=True)
+    return rest_ranks[:5 - made_card_num]
+
+  # Cards are summed as _ID_CODE values (see below). Card._id is read directly
+  # because a to_id() call per card costs as much as the rest of the lookup.
   @classmethod
   def eval_hand(self, hole, community):
-    ranks = sorted([card.rank for card in hole])
-    hole_flg = ranks[1] << 4 | ranks[0]
-    hand_flg = self.__calc_hand_info_flg(hole, community) << 8
+    code = _CODE_BASE
+    for card in hole:
+      code += _ID_CODE[card._id]
+    for card in community:
+      code += _ID_CODE[card._id]
+    return self.__lookup_score(code, hole[0].rank, hole[1].rank)
+
+  # Same as eval_hand but takes the card ids defined by Card.to_id
+  @classmethod
+  def eval_hand_ids(self, hole_ids, community_ids):
+    code = _CODE_BASE
+    for card_id in hole_ids:
+      code += _ID_CODE[card_id]
+    for card_id in community_ids:
+      code += _ID_CODE[card_id]
+    return self.__lookup_score(code, _ID_RANK[hole_ids[0]], _ID_RANK[hole_ids[1]])
+
+  # Same as eval_hand but takes 52-bit card masks (bit "card_id-1" is set for each card)
+  @classmethod
+  def eval_hand_mask(self, hole_mask, community_mask):
+    code = _CODE_BASE
+    cards_mask = hole_mask | community_mask
+    while cards_mask:
+      code += _ID_CODE[(cards_mask & -cards_mask).bit_length()]
+      cards_mask &= cards_mask - 1
+    hole_high = hole_mask.bit_length()
+    hole_low = (hole_mask & -hole_mask).bit_length()
+    return self.__lookup_score(code, _ID_RANK[hole_high], _ID_RANK[hole_low])
+
+  # Vectorized eval_hand_ids. holes is an [N, 2] and boards an [N, k] array of
+  # card ids, and the result is the [N] array of eval_hand scores.
+  @classmethod
+  def eval_hands_batch(self, holes, boards):
+    holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2)
+    boards = np.asarray(boards, dtype=np.intp).reshape(len(holes), -1)
+    cards = np.concatenate([holes, boards], axis=1)
+    rank_keys = _NP_ID_RANK_KEY[cards].sum(axis=1)
+    suit_bits = _NP_ID_SUIT_BIT[cards].sum(axis=1)  # cards are distinct, so sum == bitwise or
+    r1, r2 = _NP_ID_RANK[holes[:, 0]], _NP_ID_RANK[holes[:, 1]]
+    hole_flg = np.maximum(r1, r2) << 4 | np.minimum(r1, r2)
+    hand_flg = _NP_FLUSH_TABLE[suit_bits & 0x7fff] | _NP_FLUSH_TABLE[suit_bits >> 16 & 0x7fff]\
+        | _NP_FLUSH_TABLE[suit_bits >> 32 & 0x7fff] | _NP_FLUSH_TABLE[suit_bits >> 48]
+    rank_flg = _NP_RANK_VALUES[np.searchsorted(_NP_RANK_KEYS, rank_keys)]
+    hand_flg = np.where(hand_flg != 0, hand_flg, rank_flg)
+    hand_flg = np.where(hand_flg != 0, hand_flg, hole_flg << 8)
+    return hand_flg | hole_flg
+
+  @classmethod
+  def __lookup_score(self, code, r1, r2):
+    hole_flg = r1 << 4 | r2 if r1 > r2 else r2 << 4 | r1
+    if code & _FLUSH_COUNT_MASK:
+      suit_bits = code >> 64
+      hand_flg = _FLUSH_TABLE[suit_bits & 0x7fff] or _FLUSH_TABLE[suit_bits >> 16 & 0x7fff]\
+          or _FLUSH_TABLE[suit_bits >> 32 & 0x7fff] or _FLUSH_TABLE[suit_bits >> 48]
+    else:
+      hand_flg = _RANK_TABLE[code & _RANK_KEY_MASK] or hole_flg << 8
     return hand_flg | hole_flg
 
   # Return Format
@@ -66,172 +162,42 @@ class HandEvaluator:
   #       FullHouse of rank 3, 4   =>   100000 0011 0100
   #       FourCard of rank 2       =>  1000000 0010 0000
   #       straight flash of rank 7 => 10000000 0111 0000
-  @classmethod
-  def __calc_hand_info_flg(self, hole, community):
-    cards = hole + community
-    if self.__is_straightflash(cards): return self.STRAIGHTFLASH | self.__eval_straightflash(cards)
-    if self.__is_fourcard(cards): return self.FOURCARD | self.__eval_fourcard(cards)
-    if self.__is_fullhouse(cards): return self.FULLHOUSE | self.__eval_fullhouse(cards)
-    if self.__is_flash(cards): return self.FLASH | self.__eval_flash(cards)
-    if self.__is_straight(cards): return self.STRAIGHT | self.__eval_straight(cards)
-    if self.__is_threecard(cards): return self.THREECARD | self.__eval_threecard(cards)
-    if self.__is_twopair(cards): return self.TWOPAIR | self.__eval_twopair(cards)
-    if self.__is_onepair(cards): return self.ONEPAIR | (self.__eval_onepair(cards))
-    return self.__eval_holecard(hole)
-
-  @classmethod
-  def __eval_holecard(self, hole):
-    ranks = sorted([card.rank for card in hole])
-    return ranks[1] << 4 | ranks[0]
-
-  @classmethod
-  def __is_onepair(self, cards):
-    return self.__eval_onepair(cards) != 0
-
-  @classmethod
-  def __eval_onepair(self, cards):
-    rank = 0
-    memo = 0  # bit memo
-    for card in cards:
-      mask = 1 << card.rank
-      if memo & mask != 0: rank = max(rank, card.rank)
-      memo |= mask
-    return rank << 4
-
-  @classmethod
-  def __is_twopair(self, cards):
-    return len(self.__search_twopair(cards)) == 2
-
-  @classmethod
-  def __eval_twopair(self, cards):
-    ranks = self.__search_twopair(cards)
-    return ranks[0] << 4 | ranks[1]
-
-  @classmethod
-  def __search_twopair(self, cards):
-    ranks = []
-    memo = 0
-    for card in cards:
-      mask = 1 << card.rank
-      if memo & mask != 0: ranks.append(card.rank)
-      memo |= mask
-    return sorted(ranks)[::-1][:2]
-
-  @classmethod
-  def __is_threecard(self, cards):
-    return self.__search_threecard(cards) != -1
-
-  @classmethod
-  def __eval_threecard(self, cards):
-    return self.__search_threecard(cards) << 4
-
-  @classmethod
-  def __search_threecard(self, cards):
-    rank = -1
-    bit_memo = reduce(lambda memo,card: memo + (1 << (card.rank-1)*3), cards, 0)
-    for r in range(2, 15):
-      bit_memo >>= 3
-      count = bit_memo & 7
-      if count >= 3: rank = r
-    return rank
-
-  @classmethod
-  def __is_straight(self, cards):
-    return self.__search_straight(cards) != -1
-
-  @classmethod
-  def __eval_straight(self, cards):
-    return self.__search_straight(cards) << 4
-
-  @classmethod
-  def __search_straight(self, cards):
-    bit_memo = reduce(lambda memo, card: memo | 1 << card.rank, cards, 0)
-    rank = -1
-    straight_check = lambda acc, i: acc & (bit_memo >> (r+i) & 1) == 1
-    for r in range(2, 15):
-      if reduce(straight_check, range(5), True): rank = r
-    return rank
-
-  @classmethod
-  def __is_flash(self, cards):
-    return self.__search_flash(cards) != -1
-
-  @classmethod
-  def __eval_flash(self, cards):
-    return self.__search_flash(cards) << 4
-
-  @classmethod
-  def __search_flash(self, cards):
-    best_suit_rank = -1
-    fetch_suit = lambda card: card.suit
-    fetch_rank = lambda card: card.rank
-    for suit, group_obj in groupby(sorted(cards, key=fetch_suit), key=fetch_suit):
-      g = list(group_obj)
-      if len(g) >= 5:
-        max_rank_card = max(g, key=fetch_rank)
-        best_suit_rank = max(best_suit_rank, max_rank_card.rank)
-    return best_suit_rank
-
-  @classmethod
-  def __is_fullhouse(self, cards):
-    r1, r2 = self.__search_fullhouse(cards)
-    return r1 and r2
-
-  @classmethod
-  def __eval_fullhouse(self, cards):
-    r1, r2 = self.__search_fullhouse(cards)
-    return r1 << 4 | r2
-
-  @classmethod
-  def __search_fullhouse(self, cards):
-    fetch_rank = lambda card: card.rank
-    three_card_ranks, two_pair_ranks = [], []
-    for rank, group_obj in groupby(sorted(cards, key=fetch_rank), key=fetch_rank):
-      g = list(group_obj)
-      if len(g) >= 3:
-        three_card_ranks.append(rank)
-      if len(g) >= 2:
-        two_pair_ranks.append(rank)
-    two_pair_ranks = [rank for rank in two_pair_ranks if not rank in three_card_ranks]
-    if len(three_card_ranks) == 2:
-      two_pair_ranks.append(min(three_card_ranks))
-    max_ = lambda l: None if len(l)==0 else max(l)
-    return max_(three_card_ranks), max_(two_pair_ranks)
-
-  @classmethod
-  def __is_fourcard(self, cards):
-    return self.__eval_fourcard(cards) != 0
-
-  @classmethod
-  def __eval_fourcard(self, cards):
-    rank = self.__search_fourcard(cards)
-    return rank << 4
-
-  @classmethod
-  def __search_fourcard(self, cards):
-    fetch_rank = lambda card: card.rank
-    for rank, group_obj in groupby(sorted(cards, key=fetch_rank), key=fetch_rank):
-      g = list(group_obj)
-      if len(g) >= 4:
-        return rank
-    return 0
-
-  @classmethod
-  def __is_straightflash(self, cards):
-    return self.__search_straightflash(cards) != -1
-
-  @classmethod
-  def __eval_straightflash(self, cards):
-    return self.__search_straightflash(cards) << 4
-
-  @classmethod
-  def __search_straightflash(self, cards):
-    flash_cards = []
-    fetch_suit = lambda card: card.suit
-    for suit, group_obj in groupby(sorted(cards, key=fetch_suit), key=fetch_suit):
-      g = list(group_obj)
-      if len(g) >= 5: flash_cards = g
-    return self.__search_straight(flash_cards)
+  #
+  # Hands are scored by table lookup. _RANK_TABLE maps the rank multiset of the
+  # cards (3 bits of count per rank) to the score of the best non-flush hand,
+  # and _FLUSH_TABLE maps the rank bits of a single suit to its flush score.
+  # HighCard is stored as 0 because its score comes from the hole cards.
+  # A flush never coexists with a fullhouse or fourcard in 7 cards, so the
+  # flush lookup can safely take priority.
+  @classmethod
+  def _calc_rank_flg(self, rank_counts):
+    ranks = sorted(rank_counts)
+    four_card_ranks = [rank for rank in ranks if rank_counts[rank] >= 4]
+    three_card_ranks = [rank for rank in ranks if rank_counts[rank] == 3]
+    pair_ranks = [rank for rank in ranks if rank_counts[rank] == 2]
+    if four_card_ranks:
+      return self.FOURCARD | four_card_ranks[0] << 4
+    if len(three_card_ranks) >= 2:
+      pair_ranks.append(three_card_ranks[-2])
+    if three_card_ranks and pair_ranks:
+      return self.FULLHOUSE | three_card_ranks[-1] << 4 | max(pair_ranks)
+    straight = _STRAIGHT_TABLE[sum([1 << rank for rank in ranks])]
+    if straight:
+      return self.STRAIGHT | straight << 4
+    if three_card_ranks:
+      return self.THREECARD | three_card_ranks[-1] << 4
+    if len(pair_ranks) >= 2:
+      return self.TWOPAIR | pair_ranks[-1] << 4 | pair_ranks[-2]
+    if pair_ranks:
+      return self.ONEPAIR | pair_ranks[-1] << 4
+    return self.HIGHCARD
+
+  @classmethod
+  def _calc_flush_flg(self, rank_bits):
+    straight = _STRAIGHT_TABLE[rank_bits]
+    if straight:
+      return self.STRAIGHTFLASH | straight << 4
+    return self.FLASH | (rank_bits.bit_length() - 1) << 4
 
   @classmethod
   def __mask_hand_strength(self, bit):
@@ -258,3 +224,132 @@ class HandEvaluator:
     mask = 15
     return bit & mask
 
+
+
+# Scores many hole cards against one board. The board's rank-count key and
+# suit bits are accumulated once (and extended card by card as the board is
+# dealt), so each eval_hand only adds the two hole cards and looks up.
+class BoardEvaluator:
+
+  def __init__(self, board=None):
+    self.rank_key = 0
+    self.suit_bits = 0
+    self.suit_counts = [0, 0, 0, 0]
+    self.flush_shift = None
+    self.card_ids = []
+    for card in board or []:
+      self.add_card(card)
+
+  @classmethod
+  def from_ids(self, board_ids):
+    evaluator = self()
+    for card_id in board_ids:
+      evaluator.add_card_id(card_id)
+    return evaluator
+
+  def add_card(self, card):
+    self.add_card_id(card.to_id())
+
+  def add_card_id(self, card_id):
+    if len(self.card_ids) == 5:
+      raise ValueError(self.__exceed_card_size_msg)
+    suit_index = (card_id - 1) // 13
+    self.rank_key += _ID_RANK_KEY[card_id]
+    self.suit_bits |= _ID_SUIT_BIT[card_id]
+    self.suit_counts[suit_index] += 1
+    self.card_ids.append(card_id)
+    # only a suit with 3+ board cards can make a flush with two hole cards
+    if self.suit_counts[suit_index] >= 3:
+      self.flush_shift = 16 * suit_index
+
+  def eval_hand(self, hole):
+    return self.eval_hand_ids([card.to_id() for card in hole])
+
+  def eval_hand_ids(self, hole_ids):
+    id1, id2 = hole_ids
+    hand_flg = 0
+    if self.flush_shift is not None:
+      suit_bits = self.suit_bits | _ID_SUIT_BIT[id1] | _ID_SUIT_BIT[id2]
+      hand_flg = _FLUSH_TABLE[suit_bits >> self.flush_shift & 0x7fff]
+    r1, r2 = _ID_RANK[id1], _ID_RANK[id2]
+    hole_flg = r1 << 4 | r2 if r1 > r2 else r2 << 4 | r1
+    hand_flg = hand_flg or _RANK_TABLE[self.rank_key + _ID_RANK_KEY[id1] + _ID_RANK_KEY[id2]]\
+        or hole_flg << 8
+    return hand_flg | hole_flg
+
+  __exceed_card_size_msg = "Board is already full"
+
+# Bit position of the lowest rank of the best straight in a rank bit set
+# (0 when there is no straight). Ace counts only as high.
+def _build_straight_table():
+  table = [0] * (1 << 15)
+  for low_rank in range(2, 11):
+    straight_bits = 31 << low_rank
+    for rank_bits in range(1 << 15):
+      if rank_bits & straight_bits == straight_bits:
+        table[rank_bits] = low_rank
+  return table
+
+def _build_flush_table():
+  table = [0] * (1 << 15)
+  for rank_bits in range(1 << 15):
+    if bin(rank_bits).count("1") >= 5:
+      table[rank_bits] = HandEvaluator._calc_flush_flg(rank_bits) << 8
+  return table
+
+def _build_rank_table(max_card_num=7):
+  table = {}
+  rank_counts = {}
+  def visit(rank, card_num, rank_key):
+    if rank == 15:
+      table[rank_key] = HandEvaluator._calc_rank_flg(rank_counts) << 8
+      return
+    visit(rank + 1, card_num, rank_key)
+    for count in range(1, min(4, max_card_num - card_num) + 1):
+      rank_counts[rank] = count
+      visit(rank + 1, card_num + count, rank_key + count * _RANK_KEY[rank])
+    rank_counts.pop(rank, None)
+  visit(2, 0, 0)
+  return table
+
+def _rank_table_arrays(rank_table):
+  rank_keys = np.array(sorted(rank_table), dtype=np.int64)
+  rank_values = np.array([rank_table[key] for key in rank_keys.tolist()], dtype=np.int64)
+  return rank_keys, rank_values
+
+def _load_hand_tables():
+  global _STRAIGHT_TABLE
+  if os.path.exists(HAND_TABLES_PATH):
+    with np.load(HAND_TABLES_PATH) as tables:
+      rank_keys, rank_values = tables["rank_keys"], tables["rank_values"]
+      rank_table = dict(zip(rank_keys.tolist(), rank_values.tolist()))
+      return tables["straight"].tolist(), tables["flush"].tolist(), rank_table, rank_keys, rank_values
+  _STRAIGHT_TABLE = _build_straight_table()
+  flush_table, rank_table = _build_flush_table(), _build_rank_table()
+  return (_STRAIGHT_TABLE, flush_table, rank_table) + _rank_table_arrays(rank_table)
+
+_RANK_KEY = [1 << 3 * rank for rank in range(15)]
+_STRAIGHT_TABLE, _FLUSH_TABLE, _RANK_TABLE, _NP_RANK_KEYS, _NP_RANK_VALUES = _load_hand_tables()
+
+# Per card id (1..52) lookups: id = rank + 13 * suit_index with ace as rank 1
+_ID_RANK = [0] + [14 if card_id % 13 == 1 else (card_id - 1) % 13 + 1 for card_id in range(1, 53)]
+_ID_RANK_KEY = [0] + [_RANK_KEY[_ID_RANK[card_id]] for card_id in range(1, 53)]
+_ID_SUIT_BIT = [0] + [1 << _ID_RANK[card_id] << 16 * ((card_id - 1) // 13) for card_id in range(1, 53)]
+
+# Scalar evaluators sum one code per card: the rank key in bits 0-44, a 4 bit
+# card counter per suit in bits 48-63 and the suit bits from bit 64. Counters
+# start at 3 (_CODE_BASE), so bit 3 of a counter is set once the suit has 5+
+# cards and only then are the flush tables consulted.
+_RANK_KEY_MASK = (1 << 48) - 1
+_ID_SUIT_COUNT = [0] + [1 << 48 + 4 * ((card_id - 1) // 13) for card_id in range(1, 53)]
+_ID_CODE = [0] + [_ID_RANK_KEY[card_id] | _ID_SUIT_COUNT[card_id] | _ID_SUIT_BIT[card_id] << 64\
+    for card_id in range(1, 53)]
+_CODE_BASE = sum([3 << 48 + 4 * suit_index for suit_index in range(4)])
+_FLUSH_COUNT_MASK = sum([8 << 48 + 4 * suit_index for suit_index in range(4)])
+
+# Array forms of the tables for eval_hands_batch. _RANK_TABLE is looked up by
+# binary search over its sorted keys (_NP_RANK_KEYS/_NP_RANK_VALUES above).
+_NP_ID_RANK = np.array(_ID_RANK, dtype=np.int64)
+_NP_ID_RANK_KEY = np.array(_ID_RANK_KEY, dtype=np.int64)
+_NP_ID_SUIT_BIT = np.array(_ID_SUIT_BIT, dtype=np.int64)
+_NP_FLUSH_TABLE = np.array(_FLUSH_TABLE, dtype=np.int64)
@@ -46,23 +46,25 @@ class MessageBuilder:
     player = players[player_pos]
     hole_card = DataEncoder.encode_player(player, holecard=True)["hole_card"]
     valid_actions = ActionChecker.legal_actions(players, player_pos, state["small_blind_amount"],state["street"])
+    round_state = DataEncoder.encode_round_state(state)
     message = {
         "message_type" : self.ASK_MESSAGE,
         "hole_card": hole_card,
         "valid_actions": valid_actions,
-        "round_state": DataEncoder.encode_round_state(state),
-        "action_histories": DataEncoder.encode_action_histories(state["table"])
+        "round_state": round_state,
+        "action_histories": self.__copy_action_histories(round_state)
     }
     return self.__build_ask_message(message)
 
   @classmethod
   def build_game_update_message(self, player_pos, action, amount, state):
     player = state["table"].seats.players[player_pos]
+    round_state = DataEncoder.encode_round_state(state)
     message = {
         "message_type": self.GAME_UPDATE_MESSAGE,
         "action": DataEncoder.encode_action(player, action, amount),
-        "round_state": DataEncoder.encode_round_state(state),
-        "action_histories": DataEncoder.encode_action_histories(state["table"])
+        "round_state": round_state,
+        "action_histories": self.__copy_action_histories(round_state)
     }
     return self.__build_notification_message(message)
 
@@ -100,3 +102,11 @@ class MessageBuilder:
         "message": message
     }
 
+
+  # The histories already encoded in round_state, copied so that a player
+  # mutating one of them does not change the other
+  @classmethod
+  def __copy_action_histories(self, round_state):
+    action_histories = { street: [dict(history) for history in histories]\
+        for street, histories in round_state["action_histories"].items() }
+    return { "action_histories": action_histories }
@@ -17,6 +17,9 @@ class PayInfo:
   def update_to_allin(self):
     self.status = self.ALLIN
 
+  def copy(self):
+    return PayInfo(self.amount, self.status)
+
   # serialize format : [amount, status]
   def serialize(self):
     return [self.amount, self.status]
@@ -1,3 +1,5 @@
+from array import array
+
 from pypokerengine.engine.pay_info import PayInfo
 from pypokerengine.engine.card import Card
 from pypokerengine.engine.poker_constants import PokerConstants as Const
@@ -12,14 +14,22 @@ class Player:
   ACTION_BIG_BLIND = "BIGBLIND"
   ACTION_ANTE = "ANTE"
 
+  # action_log holds the current street's actions as flat integer entries of
+  # ACTION_LOG_WIDTH values: kind (Const.Action), amount, paid, add_amount.
+  # A log holding a non-integer amount (setup_config(5, 100, 2.5)) falls back
+  # to a plain list with the same flat layout, which keeps every amount's type.
+  # round_action_logs keeps the saved logs of each street (None if unplayed).
+  ACTION_LOG_WIDTH = 4
+
   def __init__(self, uuid, initial_stack, name="No Name"):
     self.name = name
     self.uuid = uuid
     self.hole_card = []
     self.stack = initial_stack
-    self.round_action_histories = self.__init_round_action_histories()
-    self.action_histories = []
+    self.round_action_logs = self.__init_round_action_histories()
+    self.action_log = self.__new_action_log()
     self.pay_info = PayInfo()
+    self.__init_betting_state()
 
   def add_holecard(self, cards):
     if len(self.hole_card) != 0:
@@ -48,45 +58,102 @@ class Player:
     return self.pay_info.status == PayInfo.PAY_TILL_END
 
   def add_action_history(self, kind, chip_amount=None, add_amount=None, sb_amount=None):
-    history = None
+    entry = None
     if kind == Const.Action.FOLD:
-      history = self.__fold_history()
+      entry = self.__fold_history()
     elif kind == Const.Action.CALL:
-      history = self.__call_history(chip_amount)
+      entry = self.__call_history(chip_amount)
     elif kind == Const.Action.RAISE:
-      history = self.__raise_history(chip_amount, add_amount)
+      entry = self.__raise_history(chip_amount, add_amount)
     elif kind == Const.Action.SMALL_BLIND:
-      history = self.__blind_history(True, sb_amount)
+      entry = self.__blind_history(True, sb_amount)
     elif kind == Const.Action.BIG_BLIND:
-      history = self.__blind_history(False, sb_amount)
+      entry = self.__blind_history(False, sb_amount)
     elif kind == Const.Action.ANTE:
-      history = self.__ante_history(chip_amount)
+      entry = self.__ante_history(chip_amount)
     else:
       raise "UnKnown action history is added (kind = %s)" % kind
-    history = self.__add_uuid_on_history(history)
-    self.action_histories.append(history)
+    self.action_log = self.__extend_action_log(self.action_log, entry)
+    self.__track_bet(*entry)
+
+  def action_count(self):
+    return len(self.action_log) // self.ACTION_LOG_WIDTH
 
   def save_street_action_histories(self, street_flg):
-    self.round_action_histories[street_flg] = self.action_histories
-    self.action_histories = []
+    self.past_raise_number += self.__count_raise(self.action_log)
+    self.round_action_logs[street_flg] = self.action_log
+    self.action_log = self.__new_action_log()
+    self.street_paid, self.street_raise = 0, None
 
   def clear_action_histories(self):
-    self.round_action_histories = self.__init_round_action_histories()
-    self.action_histories = []
+    self.round_action_logs = self.__init_round_action_histories()
+    self.action_log = self.__new_action_log()
+    self.__init_betting_state()
+
+  # Dict views of the action log, built on each access for the API boundary
+  # (messages, round_state). The engine itself reads action_log, so changes
+  # to the returned lists and dicts are not written back: record actions with
+  # add_action_history or replace them with restore_action_histories.
+  @property
+  def action_histories(self):
+    return self.__history_views(self.action_log)
+
+  @property
+  def round_action_histories(self):
+    return [None if log is None else self.__history_views(log) for log in self.round_action_logs]
+
+  # Replaces the log of the current street (or of the saved street street_flg)
+  # with the passed history dicts, the reverse of the views above.
+  def restore_action_histories(self, histories, street_flg=None):
+    log = self.__new_action_log()
+    for history in histories:
+      log = self.__extend_action_log(log, self.__history_entry(history))
+    if street_flg is None:
+      self.action_log = log
+    else:
+      self.round_action_logs[street_flg] = log
+
+  # Rebuilds the betting state from the logs, for code which assigns the
+  # logs directly instead of calling add_action_history.
+  def sync_betting_state(self):
+    self.__init_betting_state()
+    width = self.ACTION_LOG_WIDTH
+    for idx in range(0, len(self.action_log), width):
+      self.__track_bet(*self.action_log[idx:idx+width])
+    for log in self.round_action_logs:
+      if log is None: break
+      self.past_raise_number += self.__count_raise(log)
 
   def clear_pay_info(self):
     self.pay_info = PayInfo()
 
   def paid_sum(self):
-    pay_history = [h for h in self.action_histories if h["action"] not in ["FOLD", "ANTE"]]
-    last_pay_history = pay_history[-1] if len(pay_history)!=0 else None
-    return last_pay_history["amount"] if last_pay_history else 0
+    return self.street_paid
+
+  # Saved street logs are never mutated, so the copy shares them and only
+  # duplicates the log of the current street.
+  def copy(self):
+    player = Player.__new__(Player)
+    player.name = self.name
+    player.uuid = self.uuid
+    player.hole_card = self.hole_card[::]
+    player.stack = self.stack
+    player.round_action_logs = self.round_action_logs[::]
+    player.action_log = self.action_log[::]
+    player.pay_info = self.pay_info.copy()
+    player.street_paid = self.street_paid
+    player.street_raise = self.street_raise
+    player.past_raise_number = self.past_raise_number
+    return player
 
+  # serialize format : [name, uuid, stack, hole_card_ids, action_log,
+  #                      pay_info, round_action_logs]
   def serialize(self):
     hole = [card.to_id() for card in self.hole_card]
+    round_logs = [None if log is None else list(log) for log in self.round_action_logs]
     return [
         self.name, self.uuid, self.stack, hole,\
-            self.action_histories[::], self.pay_info.serialize(), self.round_action_histories[::]
+            list(self.action_log), self.pay_info.serialize(), round_logs
     ]
 
   @classmethod
@@ -94,9 +161,10 @@ class Player:
     hole = [Card.from_id(cid) for cid in serial[3]]
     player = self(serial[1], serial[2], serial[0])
     if len(hole)!=0: player.add_holecard(hole)
-    player.action_histories = serial[4]
+    player.action_log = self.__new_action_log(serial[4])
     player.pay_info = PayInfo.deserialize(serial[5])
-    player.round_action_histories = serial[6]
+    player.round_action_logs = [None if log is None else self.__new_action_log(log) for log in serial[6]]
+    player.sync_betting_state()
     return player
 
   """ private """
@@ -109,43 +177,80 @@ class Player:
   def __init_round_action_histories(self):
     return [None for _ in range(4)]  # 4 == len(["preflop", "flop", "turn", "river"])
 
+  @staticmethod
+  def __new_action_log(entries=()):
+    entries = list(entries)
+    if not all([type(value) is int for value in entries]): return entries
+    return array("q", entries)
+
+  @staticmethod
+  def __extend_action_log(log, entry):
+    if isinstance(log, array) and not all([type(value) is int for value in entry]):
+      log = log.tolist()
+    log.extend(entry)
+    return log
+
+  # Betting state of the current street, kept up to date on each action so
+  # that ActionChecker does not rescan the histories:
+  #   street_paid       : amount of the last pay history (see paid_sum)
+  #   street_raise      : (amount, add_amount) of the highest RAISE/SMALLBLIND/BIGBLIND
+  #   past_raise_number : RAISE count of the saved streets
+  def __init_betting_state(self):
+    self.street_paid = 0
+    self.street_raise = None
+    self.past_raise_number = 0
+
+  def __track_bet(self, kind, amount, paid, add_amount):
+    if kind in [Const.Action.FOLD, Const.Action.ANTE]: return
+    self.street_paid = amount
+    if kind == Const.Action.CALL: return
+    if self.street_raise is None or amount > self.street_raise[0]:
+      self.street_raise = (amount, add_amount)
+
+  def __count_raise(self, log):
+    return log[::self.ACTION_LOG_WIDTH].count(Const.Action.RAISE)
+
   def __fold_history(self):
-    return { "action" : self.ACTION_FOLD_STR }
+    return (Const.Action.FOLD, 0, 0, 0)
 
   def __call_history(self, bet_amount):
-    return {
-        "action" : self.ACTION_CALL_STR,
-        "amount" : bet_amount,
-        "paid" : bet_amount - self.paid_sum()
-    }
+    return (Const.Action.CALL, bet_amount, bet_amount - self.paid_sum(), 0)
 
   def __raise_history(self, bet_amount, add_amount):
-    return {
-        "action" : self.ACTION_RAISE_STR,
-        "amount" : bet_amount,
-        "paid" : bet_amount - self.paid_sum(),
-        "add_amount" : add_amount
-        }
+    return (Const.Action.RAISE, bet_amount, bet_amount - self.paid_sum(), add_amount)
 
   def __blind_history(self, small_blind, sb_amount):
     assert(sb_amount is not None)
-    action = self.ACTION_SMALL_BLIND if small_blind else self.ACTION_BIG_BLIND
+    kind = Const.Action.SMALL_BLIND if small_blind else Const.Action.BIG_BLIND
     amount = sb_amount if small_blind else sb_amount*2
     add_amount = sb_amount
-    return {
-        "action" : action,
-        "amount" : amount,
-        "add_amount" : add_amount
-        }
+    return (kind, amount, 0, add_amount)
 
   def __ante_history(self, pay_amount):
     assert(pay_amount > 0)
-    return {
-        "action" : self.ACTION_ANTE,
-        "amount" : pay_amount
-        }
+    return (Const.Action.ANTE, pay_amount, 0, 0)
+
+  def __history_views(self, log):
+    width = self.ACTION_LOG_WIDTH
+    return [self.__history_view(*log[idx:idx+width]) for idx in range(0, len(log), width)]
 
-  def __add_uuid_on_history(self, history):
+  # Same keys as the history dicts the engine used to store
+  def __history_view(self, kind, amount, paid, add_amount):
+    history = { "action" : self.__action_strs[kind] }
+    if kind != Const.Action.FOLD:
+      history["amount"] = amount
+    if kind in [Const.Action.CALL, Const.Action.RAISE]:
+      history["paid"] = paid
+    if kind in [Const.Action.RAISE, Const.Action.SMALL_BLIND, Const.Action.BIG_BLIND]:
+      history["add_amount"] = add_amount
     history["uuid"] = self.uuid
     return history
 
+  def __history_entry(self, history):
+    kind = self.__action_strs.index(history["action"])
+    return (kind, history.get("amount", 0), history.get("paid", 0), history.get("add_amount", 0))
+
+  # indexed by Const.Action
+  __action_strs = [ACTION_FOLD_STR, ACTION_CALL_STR, ACTION_RAISE_STR,\
+      ACTION_SMALL_BLIND, ACTION_BIG_BLIND, ACTION_ANTE]
+
@@ -10,8 +10,10 @@ from pypokerengine.engine.message_builder import MessageBuilder
 
 class RoundManager:
 
+  # messages=False skips building the messages (the returned list is empty),
+  # for headless simulations where nobody receives them.
   @classmethod
-  def start_new_round(self, round_count, small_blind_amount, ante_amount, table):
+  def start_new_round(self, round_count, small_blind_amount, ante_amount, table, messages=True):
     _state = self.__gen_initial_state(round_count, small_blind_amount, table)
     state = self.__deep_copy_state(_state)
     table = state["table"]
@@ -20,26 +22,65 @@ class RoundManager:
     self.__correct_ante(ante_amount, table.seats.players)
     self.__correct_blind(small_blind_amount, table)
     self.__deal_holecard(table.deck, table.seats.players)
-    start_msg = self.__round_start_message(round_count, table)
-    state, street_msgs = self.__start_street(state)
+    start_msg = self.__round_start_message(round_count, table) if messages else []
+    state, street_msgs = self.__start_street(state, messages)
     return state, start_msg + street_msgs
 
   @classmethod
-  def apply_action(self, original_state, action):
-    state = self.__deep_copy_state(original_state)
+  def apply_action(self, original_state, action, messages=True):
+    # copy-on-write: only the acting player is copied unless the street ends
+    state = self.__copy_on_write_state(original_state)
+    state["table"].own_player(state["next_player"])
     state,bet_amount = self.__update_state_by_action(state, action)
-    update_msg = self.__update_message(state, action, bet_amount)
+    update_msg = [self.__update_message(state, action, bet_amount)] if messages else []
     if self.__is_everyone_agreed(state):
+      state["table"].own_all()
       [player.save_street_action_histories(state["street"]) for player in state["table"].seats.players]
       state["street"] += 1
-      state, street_msgs = self.__start_street(state)
-      return state, [update_msg] + street_msgs
+      state, street_msgs = self.__start_street(state, messages)
+      return state, update_msg + street_msgs
     else:
       state["next_player"] = state["table"].next_ask_waiting_player_pos(state["next_player"])
+      if not messages: return state, []
       next_player_pos = state["next_player"]
       next_player = state["table"].seats.players[next_player_pos]
       ask_message = (next_player.uuid, MessageBuilder.build_ask_message(next_player_pos, state))
-      return state, [update_msg, ask_message]
+      return state, update_msg + [ask_message]
+
+  # Mutable fast path for tree search and rollouts. It applies the action to
+  # the state itself and returns a token, and undo(state, token) restores the
+  # exact prior state. Tokens must be undone in LIFO order. The state must not
+  # share players with other states (use deepcopy_game_state on states that
+  # came from apply_action).
+  @classmethod
+  def apply_action_inplace(self, state, action):
+    table = state["table"]
+    street, pos = state["street"], state["next_player"]
+    player = table.seats.players[pos]
+    stack, pay_amount, pay_status = player.stack, player.pay_info.amount, player.pay_info.status
+    history_len = len(player.action_log)
+    self.__update_state_by_action(state, action)
+    street_snapshot = None
+    if self.__is_everyone_agreed(state):
+      street_snapshot = self.__snapshot_street(table)
+      [player.save_street_action_histories(state["street"]) for player in table.seats.players]
+      state["street"] += 1
+      self.__start_street(state, False)
+    else:
+      state["next_player"] = table.next_ask_waiting_player_pos(pos)
+    return (street, pos, stack, pay_amount, pay_status, history_len, street_snapshot)
+
+  @classmethod
+  def undo(self, state, token):
+    street, pos, stack, pay_amount, pay_status, history_len, street_snapshot = token
+    table = state["table"]
+    if street_snapshot: self.__restore_street(table, street_snapshot)
+    player = table.seats.players[pos]
+    player.stack = stack
+    player.pay_info.amount, player.pay_info.status = pay_amount, pay_status
+    del player.action_log[history_len:]
+    player.sync_betting_state()
+    state["street"], state["next_player"] = street, pos
 
 
 
@@ -72,53 +113,54 @@ class RoundManager:
       player.add_holecard(deck.draw_cards(2))
 
   @classmethod
-  def __start_street(self, state):
+  def __start_street(self, state, messages):
     next_player_pos = state["table"].next_ask_waiting_player_pos(state["table"].sb_pos()-1)
     state["next_player"] = next_player_pos
     street = state["street"]
     if street == Const.Street.PREFLOP:
-      return self.__preflop(state)
+      return self.__preflop(state, messages)
     elif street == Const.Street.FLOP:
-      return self.__flop(state)
+      return self.__flop(state, messages)
     elif street == Const.Street.TURN:
-      return self.__turn(state)
+      return self.__turn(state, messages)
     elif street == Const.Street.RIVER:
-      return self.__river(state)
+      return self.__river(state, messages)
     elif street == Const.Street.SHOWDOWN:
-      return self.__showdown(state)
+      return self.__showdown(state, messages)
     else:
       raise ValueError("Street is already finished [street = %d]" % street)
 
   @classmethod
-  def __preflop(self, state):
+  def __preflop(self, state, messages):
     for i in range(2):
       state["next_player"] = state["table"].next_ask_waiting_player_pos(state["next_player"])
-    return self.__forward_street(state)
+    return self.__forward_street(state, messages)
 
   @classmethod
-  def __flop(self, state):
+  def __flop(self, state, messages):
     for card in state["table"].deck.draw_cards(3):
       state["table"].add_community_card(card)
-    return self.__forward_street(state)
+    return self.__forward_street(state, messages)
 
   @classmethod
-  def __turn(self, state):
+  def __turn(self, state, messages):
     state["table"].add_community_card(state["table"].deck.draw_card())
-    return self.__forward_street(state)
+    return self.__forward_street(state, messages)
 
   @classmethod
-  def __river(self, state):
+  def __river(self, state, messages):
     state["table"].add_community_card(state["table"].deck.draw_card())
-    return self.__forward_street(state)
+    return self.__forward_street(state, messages)
 
   @classmethod
-  def __showdown(self, state):
+  def __showdown(self, state, messages):
     winners, hand_info, prize_map = GameEvaluator.judge(state["table"])
     self.__prize_to_winners(state["table"].seats.players, prize_map)
-    result_message = MessageBuilder.build_round_result_message(state["round_count"], winners, hand_info, state)
+    result_msg = [(-1, MessageBuilder.build_round_result_message(\
+        state["round_count"], winners, hand_info, state))] if messages else []
     state["table"].reset()
     state["street"] += 1
-    return state, [(-1, result_message)]
+    return state, result_msg
 
   @classmethod
   def __prize_to_winners(self, players, prize_map):
@@ -132,15 +174,16 @@ class RoundManager:
     return reduce(lambda acc, idx: acc + [gen_msg(idx)], range(len(players)), [])
 
   @classmethod
-  def __forward_street(self, state):
+  def __forward_street(self, state, messages):
     table = state["table"]
-    street_start_msg = [(-1, MessageBuilder.build_street_start_message(state))]
+    street_start_msg = [(-1, MessageBuilder.build_street_start_message(state))] if messages else []
     if table.seats.count_active_players() == 1: street_start_msg = []
     if table.seats.count_ask_wait_players() <= 1:
       state["street"] += 1
-      state, messages = self.__start_street(state)
-      return state, street_start_msg + messages
+      state, street_msgs = self.__start_street(state, messages)
+      return state, street_start_msg + street_msgs
     else:
+      if not messages: return state, []
       next_player_pos = state["next_player"]
       next_player = table.seats.players[next_player_pos]
       ask_message = [(next_player.uuid, MessageBuilder.build_ask_message(next_player_pos, state))]
@@ -215,13 +258,34 @@ class RoundManager:
   @classmethod
   def __is_agreed(self, max_pay, player):
     # BigBlind should be asked action at least once
-    is_preflop = player.round_action_histories[0] == None
-    bb_ask_once = len(player.action_histories)==1 \
-            and player.action_histories[0]["action"] == Player.ACTION_BIG_BLIND
+    is_preflop = player.round_action_logs[0] == None
+    bb_ask_once = player.action_count()==1 \
+            and player.action_log[0] == Const.Action.BIG_BLIND
     bb_ask_check = not is_preflop or not bb_ask_once
-    return (bb_ask_check and player.paid_sum() == max_pay and len(player.action_histories) != 0)\
+    return (bb_ask_check and player.paid_sum() == max_pay and player.action_count() != 0)\
         or player.pay_info.status in [PayInfo.FOLDED, PayInfo.ALLIN]
 
+  # Street transitions and the showdown reassign (never mutate) the saved
+  # lists and pay info, so keeping references is enough to restore them.
+  @classmethod
+  def __snapshot_street(self, table):
+    players = [(p.stack, p.pay_info, p.hole_card, p.action_log, p.round_action_logs[::])\
+        for p in table.seats.players]
+    return players, bytes(table.deck.deck), table.get_community_card()
+
+  # The snapshot's action_log was saved as a street log, which copies of the
+  # state share, so the live log is a fresh copy that undo may truncate.
+  @classmethod
+  def __restore_street(self, table, snapshot):
+    players, deck_ids, community_card = snapshot
+    for player, saved in zip(table.seats.players, players):
+      player.stack, player.pay_info, player.hole_card, action_log, rounds = saved
+      player.action_log = action_log[::]
+      player.round_action_logs = rounds[::]
+      player.sync_betting_state()
+    table.deck.deck = bytearray(deck_ids)
+    table._community_card = community_card[::]
+
   @classmethod
   def __gen_initial_state(self, round_count, small_blind_amount, table):
     return {
@@ -234,11 +298,18 @@ class RoundManager:
 
   @classmethod
   def __deep_copy_state(self, state):
-    table_deepcopy = Table.deserialize(state["table"].serialize())
+    return self.__copy_state(state, state["table"].copy())
+
+  @classmethod
+  def __copy_on_write_state(self, state):
+    return self.__copy_state(state, state["table"].copy(copy_on_write=True))
+
+  @classmethod
+  def __copy_state(self, state, table):
     return {
         "round_count": state["round_count"],
         "small_blind_amount": state["small_blind_amount"],
         "street": state["street"],
         "next_player": state["next_player"],
-        "table": table_deepcopy
+        "table": table
         }
@@ -18,6 +18,13 @@ class Seats:
   def count_ask_wait_players(self):
     return len([p for p in self.players if p.is_waiting_ask()])
 
+  # share_players=True keeps the same Player objects in a new list, the
+  # owner replaces a player with player.copy() before mutating it.
+  def copy(self, share_players=False):
+    seats = Seats()
+    seats.players = self.players[::] if share_players else [p.copy() for p in self.players]
+    return seats
+
   def serialize(self):
     return [player.serialize() for player in self.players]
 
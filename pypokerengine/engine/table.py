@@ -47,6 +47,28 @@ class Table:
   def next_ask_waiting_player_pos(self, start_pos):
     return self.__find_entitled_player_pos(start_pos, lambda player: player.is_waiting_ask())
 
+  # Structural copy of the table (same result as deserialize(serialize())).
+  # With copy_on_write=True the players and the deck are shared with this
+  # table, and the caller must copy them (own_player / own_all) before
+  # mutating them.
+  def copy(self, copy_on_write=False):
+    table = Table.__new__(Table)
+    table.dealer_btn = self.dealer_btn
+    table._blind_pos = self._blind_pos
+    table.seats = self.seats.copy(share_players=copy_on_write)
+    table.deck = self.deck if copy_on_write else self.deck.copy()
+    table._community_card = self._community_card[::]
+    return table
+
+  def own_player(self, pos):
+    player = self.seats.players[pos].copy()
+    self.seats.players[pos] = player
+    return player
+
+  def own_all(self):
+    self.seats.players = [player.copy() for player in self.seats.players]
+    self.deck = self.deck.copy()
+
   def serialize(self):
     community_card = [card.to_id() for card in self._community_card]
     return [
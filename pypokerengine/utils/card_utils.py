@@ -1,17 +1,322 @@
-import random
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations, permutations
+from math import comb, sqrt
+from statistics import NormalDist
+
+import numpy as np
 
 from pypokerengine.engine.card import Card
 from pypokerengine.engine.deck import Deck
-from pypokerengine.engine.hand_evaluator import HandEvaluator
+from pypokerengine.engine.hand_evaluator import HandEvaluator, BoardEvaluator
+
+# exact="auto" enumerates every runout when there are at most this many
+# (heads-up that is the turn and the river), otherwise it samples.
+EXACT_ENUMERATION_BUDGET = 50000
+
+# Win rate of each of the 169 preflop hand classes against 1-9 random
+# opponents, generated by build_preflop_equity.py
+PREFLOP_EQUITY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),\
+        "models", "preflop_equity.json")
+
+# estimate_hole_card_win_rate keeps the results of this many distinct spots
+# (suit-canonical hole and board, nb_player, nb_simulation, exact, target_error,
+# seed, nb_worker).
+# time_budget_ms is not part of the key: a run which the budget cut short is
+# not cached, and a hit (always a complete run) is returned whatever the budget.
+EQUITY_CACHE_SIZE = 4096
+
+# With a target_error or a time_budget_ms, runouts are sampled this many at a
+# time until the error of the estimate reaches the target, the time budget is
+# spent or nb_simulation runs out
+ADAPTIVE_BATCH_SIZE = 200
+
+# Rounds of rejection sampling estimate_range_equity tries before giving up
+# on ranges which (almost) always share a card
+RANGE_MAX_DRAW_ROUNDS = 100
+
+# estimate_range_equity (heads-up) enumerates every runout when there are at
+# most RANGE_EXACT_RUNOUTS of them (any flop or turn) and runouts * live combos
+# of the first range * live combos of the second is at most RANGE_EXACT_BUDGET,
+# scoring runouts in chunks of about RANGE_CHUNK_SIZE combo pairs
+RANGE_EXACT_RUNOUTS = 1500
+RANGE_EXACT_BUDGET = 5000000
+RANGE_CHUNK_SIZE = 2000000
+
+# estimate_board_equities enumerates the runouts when there are at most this
+# many (any flop or turn), otherwise it samples nb_simulation of them, and
+# scores BOARD_CHUNK_SIZE runouts at a time
+BOARD_EXACT_RUNOUTS = 1500
+BOARD_CHUNK_SIZE = 64
+
+# Monte Carlo runouts are drawn and scored as arrays of this many rows at a time
+MONTECARLO_BATCH_SIZE = 50000
 
 def gen_cards(cards_str):
     return [Card.from_str(s) for s in cards_str]
 
-def estimate_hole_card_win_rate(nb_simulation, nb_player, hole_card, community_card=None):
-    if not community_card: community_card = []
-    win_count = sum([_montecarlo_simulation(nb_player, hole_card, community_card) for _ in range(nb_simulation)])
+# Compiles range notation such as "TT+, AKs, A5s-A2s, KQo, AsKh, QJs:0.5" into
+# a weight per combo (see gen_hole_combos). A combo listed twice keeps its
+# largest weight, combos holding a dead card get weight 0.
+def gen_range(range_str, dead_cards=None):
+    weights = np.zeros(len(_HOLE_COMBO_IDS))
+    for token in [token.strip() for token in range_str.split(",") if token.strip()]:
+        notation, _, weight = token.partition(":")
+        weights = np.maximum(weights, _parse_range_notation(notation.strip()) * float(weight or 1.0))
+    return remove_dead_cards(weights, dead_cards) if dead_cards else weights
+
+# The combos of a range as a 1326 element boolean mask
+def gen_range_mask(range_str, dead_cards=None):
+    return gen_range(range_str, dead_cards) > 0
+
+# dead_cards are Cards or card strings ("SA")
+def remove_dead_cards(hand_range, dead_cards):
+    dead_ids = [(Card.from_str(card) if isinstance(card, str) else card).to_id() for card in dead_cards]
+    return np.where(_HOLE_COMBO_MASKS & gen_card_mask(dead_ids), 0, hand_range).astype(hand_range.dtype)
+
+# Union and intersection of weight vectors or masks: the largest (smallest)
+# weight of each combo.
+def range_union(*hand_ranges):
+    return np.maximum.reduce(hand_ranges)
+
+def range_intersection(*hand_ranges):
+    return np.minimum.reduce(hand_ranges)
+
+def gen_card_mask(card_ids):
+    mask = 0
+    for card_id in card_ids:
+        mask |= 1 << (card_id - 1)
+    return mask
+
+# target_error turns nb_simulation into an upper bound: sampling stops as soon
+# as the standard error (or, with a confidence such as 0.95, the half-width of
+# that confidence interval) is at most target_error, and the achieved error is
+# returned next to the estimate as (win_rate, error).
+# time_budget_ms keeps refining the estimate until that many milliseconds have
+# passed and returns the best estimate so far (at least one batch is sampled),
+# with exact="auto" it also gives up enumerating when the budget runs out.
+# seed makes the sampling reproducible, and nb_worker > 1 splits a fixed
+# nb_simulation over that many processes, each drawing from its own stream
+# spawned from seed (the result depends only on seed and nb_worker).
+# Preflop the precomputed table is used unless exact=True, a seed, nb_worker or
+# target_error asks for a run of its own.
+def estimate_hole_card_win_rate(nb_simulation, nb_player, hole_card, community_card=None, exact=False,\
+        target_error=None, confidence=None, time_budget_ms=None, seed=None, nb_worker=None):
+    error_scale = NormalDist().inv_cdf(0.5 + confidence / 2) if confidence else 1.0
+    use_preflop_table = not community_card and exact in [False, "auto"]\
+            and seed is None and nb_worker is None and target_error is None
+    preflop_equity = _fetch_preflop_equity(nb_player, hole_card) if use_preflop_table else None
+    if preflop_equity is not None:
+        win_rate, std_error = preflop_equity
+        result = (win_rate, error_scale * std_error)
+    else:
+        hole_ids, community_ids = gen_canonical_key(hole_card, community_card)
+        deadline = time.perf_counter() + time_budget_ms / 1000.0 if time_budget_ms is not None else None
+        result = _cached_win_rate(nb_simulation, nb_player, hole_ids, community_ids, exact,\
+                target_error, error_scale, deadline, seed, nb_worker)
+    return result[0] if target_error is None else result
+
+# Spots which are the same up to a permutation of the four suits get the same
+# key: (sorted hole ids, sorted community ids) smallest over all permutations.
+def gen_canonical_key(hole_card, community_card=None):
+    hole_ids = [card.to_id() for card in hole_card]
+    community_ids = [card.to_id() for card in community_card] if community_card else []
+    return min([(tuple(sorted([table[i] for i in hole_ids])), tuple(sorted([table[i] for i in community_ids])))\
+            for table in _SUIT_PERMUTATION_TABLES])
+
+# hits, misses, maxsize and currsize of the estimate_hole_card_win_rate cache
+def equity_cache_info():
+    with _equity_cache_lock:
+        return EquityCacheInfo(_equity_cache_stats["hits"], _equity_cache_stats["misses"],\
+                EQUITY_CACHE_SIZE, len(_equity_cache))
+
+def clear_equity_cache():
+    with _equity_cache_lock:
+        _equity_cache.clear()
+        _equity_cache_stats.update({ "hits": 0, "misses": 0 })
+
+# The 1326 two-card holdings as (card id, card id) in a fixed order, a range
+# is a weight per combo in this order.
+def gen_hole_combos():
+    return [tuple(combo) for combo in _HOLE_COMBO_IDS.tolist()]
+
+# hand_range is either range notation (see gen_range), an array of 1326
+# weights (or a mask), or an iterable of holes
+# (two Cards or card strings), each optionally paired with a weight:
+# [["SA", "HA"], (gen_cards(["SK", "HK"]), 0.5)] or { ("SA", "HA"): 1.0 }
+def gen_range_weights(hand_range):
+    if isinstance(hand_range, str):
+        return gen_range(hand_range)
+    if isinstance(hand_range, np.ndarray):
+        assert hand_range.shape == (len(_HOLE_COMBO_IDS),)
+        return hand_range.astype(np.float64)
+    items = hand_range.items() if isinstance(hand_range, dict) else\
+            [item if isinstance(item[1], (int, float)) else (item, 1.0) for item in hand_range]
+    weights = np.zeros(len(_HOLE_COMBO_IDS))
+    for hole, weight in items:
+        weights[_hole_combo_index(hole)] = weight
+    return weights
+
+# Share of the pot each range wins (ties split) when every range is dealt a
+# combo with probability proportional to its weight, skipping deals where
+# combos share a card or are blocked by the board. Two ranges are enumerated
+# exactly when that is cheap (see RANGE_EXACT_RUNOUTS), otherwise nb_simulation
+# deals and runouts are sampled.
+def estimate_range_equity(nb_simulation, hand_ranges, community_card=None, exact="auto", seed=None):
+    community_ids = [card.to_id() for card in community_card] if community_card else []
+    board_mask = gen_card_mask(community_ids)
+    weights = [np.where(_HOLE_COMBO_MASKS & board_mask, 0.0, gen_range_weights(hand_range))\
+            for hand_range in hand_ranges]
+    if any([not weight.sum() > 0 for weight in weights]):
+        raise ValueError("every range needs a combo which is not blocked by the board")
+    unused_ids = _unused_card_ids(community_ids)
+    if exact == "auto":
+        runout_num = comb(len(unused_ids), 5 - len(community_ids))
+        exact = len(weights) == 2 and runout_num <= RANGE_EXACT_RUNOUTS and\
+                runout_num * np.count_nonzero(weights[0]) * np.count_nonzero(weights[1]) <= RANGE_EXACT_BUDGET
+    if exact:
+        if len(weights) != 2: raise ValueError("exact range equity supports two ranges")
+        return _enumerate_range_equity(weights, community_ids, unused_ids)
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    return _montecarlo_range_equity(nb_simulation, weights, community_ids, unused_ids, rng)
+
+# Win, tie and loss counts of hole_card over nb_simulation sampled runouts
+# and, from the same runouts, hand strength on the current board and hand
+# potential: ppot is the chance to end ahead when behind now, npot the chance
+# to end behind when ahead now (ties count half), and
+# effective_hand_strength = hand_strength * (1 - npot) + (1 - hand_strength) * ppot.
+# Before the flop there is no current hand to compare, hand_strength is then
+# the final win rate (ties half) and ppot and npot are None.
+def estimate_hand_potential(nb_simulation, nb_player, hole_card, community_card=None, seed=None):
+    hole_ids = [card.to_id() for card in hole_card]
+    community_ids = [card.to_id() for card in community_card] if community_card else []
+    unused_ids = _unused_card_ids(hole_ids + community_ids)
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    # rows: ahead, tied, behind on the current board / columns: win, tie, loss
+    transitions = np.zeros((3, 3), dtype=np.int64)
+    now_scores = _score_hole_combos(community_ids) if len(community_ids) >= 3 else None
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        batch_size = min(MONTECARLO_BATCH_SIZE, nb_simulation - offset)
+        scores, holes = _sample_showdowns(batch_size, nb_player, hole_ids, community_ids, unused_ids, rng)
+        final_state = _showdown_state(scores[:, 0], scores[:, 1:].max(axis=1))
+        if now_scores is None:
+            now_state = np.ones(batch_size, dtype=np.intp)
+        else:
+            combo_scores = now_scores[_NP_COMBO_INDEX[holes[:, :, 0], holes[:, :, 1]]]
+            now_state = _showdown_state(combo_scores[:, 0], combo_scores[:, 1:].max(axis=1))
+        np.add.at(transitions, (now_state, final_state), 1)
+    win, tie, loss = [int(count) for count in transitions.sum(axis=0)]
+    potential = { "win": win, "tie": tie, "loss": loss }
+    if now_scores is None:
+        potential.update({ "hand_strength": (win + tie / 2.0) / nb_simulation, "ppot": None, "npot": None })
+        potential["effective_hand_strength"] = potential["hand_strength"]
+        return potential
+    ahead, tied, behind = transitions.sum(axis=1)
+    hand_strength = (ahead + tied / 2.0) / nb_simulation
+    ppot_base, npot_base = behind + tied / 2.0, ahead + tied / 2.0
+    ppot = (transitions[2, 0] + transitions[2, 1] / 2.0 + transitions[1, 0] / 2.0) / ppot_base if ppot_base else 0.0
+    npot = (transitions[0, 2] + transitions[1, 2] / 2.0 + transitions[0, 1] / 2.0) / npot_base if npot_base else 0.0
+    potential.update({
+        "hand_strength": float(hand_strength),
+        "ppot": float(ppot),
+        "npot": float(npot),
+        "effective_hand_strength": float(hand_strength * (1 - npot) + (1 - hand_strength) * ppot)
+    })
+    return potential
+
+# Pre-drawn runouts for common random numbers: every query answered by
+# estimate_win_rate_on_runouts sees the same boards and opponent cards (minus
+# its own hole cards), so the difference between two holdings, or between two
+# bot versions on one spot, is not swamped by independent sampling noise.
+# stratified deals every possible holding to the first opponent equally often
+# (as far as nb_simulation allows), the largest source of noise heads-up.
+# The picked card ids are kept as uint8, a million runouts of a flop take 6MB.
+def gen_common_runouts(nb_simulation, nb_player, community_card=None, seed=None, stratified=False):
+    community_ids = [card.to_id() for card in community_card] if community_card else []
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    need_num = 5 - len(community_ids)
+    # two spare cards per row stand in for the ones a query's hole cards block
+    draw_num = need_num + (nb_player-1)*2 + 2
+    picked_ids = _draw_unused_ids(rng, nb_simulation, _unused_card_ids(community_ids), draw_num,\
+            stratified, np.uint8)
+    # the stratified pair comes first, move it behind the community cards
+    picked_ids = np.roll(picked_ids, need_num, axis=1) if stratified else picked_ids
+    return CommonRunouts(nb_player, community_ids, picked_ids)
+
+# Win rate (ties count as wins, as in estimate_hole_card_win_rate) of
+# hole_card on runouts from gen_common_runouts
+def estimate_win_rate_on_runouts(runouts, hole_card):
+    hole_ids = [card.to_id() for card in hole_card]
+    nb_simulation, draw_num = runouts.picked_ids.shape
+    win_count = 0
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        picked_ids = runouts.picked_ids[offset:offset+MONTECARLO_BATCH_SIZE].astype(np.intp)
+        picked_ids = _replace_blocked_ids(picked_ids, hole_ids)
+        scores, _ = _score_showdowns(runouts.nb_player, hole_ids, runouts.community_ids, picked_ids)
+        win_count += int(np.count_nonzero(scores[:, 0] >= scores[:, 1:].max(axis=1)))
     return 1.0 * win_count / nb_simulation
 
+# Each of our hole cards among the first columns is replaced in place by the
+# next spare card (the last two columns) which is not ours, a uniform draw from
+# the rest of the deck in which every other card keeps its column, so the
+# stratified pair is not shifted onto the board.
+def _replace_blocked_ids(picked_ids, hole_ids):
+    dealt_ids, spare_ids = picked_ids[:, :-2], picked_ids[:, -2:]
+    spare_order = np.argsort(np.isin(spare_ids, hole_ids), axis=1, kind="stable")
+    spare_ids = np.take_along_axis(spare_ids, spare_order, axis=1)
+    blocked = np.isin(dealt_ids, hole_ids)
+    spare_index = np.maximum(np.cumsum(blocked, axis=1) - 1, 0)
+    return np.where(blocked, np.take_along_axis(spare_ids, spare_index, axis=1), dealt_ids)
+
+# Equity (ties count half) of every combo (see gen_hole_combos) against one
+# uniformly random opponent holding on community_card, averaged over the
+# remaining runouts, nan for combos blocked by the board. With bins, also
+# returns the (1326, bins) histogram of each combo's final-board equity over
+# the runouts, as fractions of its runouts.
+# Each runout scores every live combo once and ranks the scores, the
+# opponents blocked by a combo's own cards are taken off per card.
+def estimate_board_equities(nb_simulation, community_card=None, bins=None, seed=None):
+    community_ids = [card.to_id() for card in community_card] if community_card else []
+    unused_ids = _unused_card_ids(community_ids)
+    need_num = 5 - len(community_ids)
+    runout_num = comb(len(unused_ids), need_num)
+    if runout_num <= BOARD_EXACT_RUNOUTS:
+        runouts = np.array(list(combinations(unused_ids, need_num)), dtype=np.intp).reshape(runout_num, need_num)
+    else:
+        rng = np.random.default_rng(seed) if seed is not None else np.random
+        runouts = _draw_unused_ids(rng, nb_simulation, unused_ids, need_num, dtype=np.uint8)
+    equity_sum = np.zeros(len(_HOLE_COMBO_IDS))
+    runout_count = np.zeros(len(_HOLE_COMBO_IDS))
+    histograms = np.zeros((len(_HOLE_COMBO_IDS), bins)) if bins else None
+    for offset in range(0, len(runouts), BOARD_CHUNK_SIZE):
+        chunk = runouts[offset:offset+BOARD_CHUNK_SIZE].astype(np.intp)
+        boards = np.hstack([np.broadcast_to(np.array(community_ids, dtype=np.intp), (len(chunk), len(community_ids))), chunk])
+        equities, live_flg = _showdown_equities(boards)
+        equity_sum += np.where(live_flg, equities, 0).sum(axis=0)
+        runout_count += live_flg.sum(axis=0)
+        if bins:
+            _, combo_index = np.nonzero(live_flg)
+            bin_index = np.minimum((equities[live_flg] * bins).astype(np.intp), bins - 1)
+            np.add.at(histograms, (combo_index, bin_index), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        equities = equity_sum / runout_count
+        if bins: histograms /= runout_count[:, None]
+    equities[runout_count == 0] = np.nan
+    return (equities, histograms) if bins else equities
+
+def gen_preflop_hand_classes():
+    ranks = [Card.RANK_MAP[rank] for rank in range(14, 1, -1)]
+    pairs = [high + high for high in ranks]
+    suited = [high + low + "s" for i, high in enumerate(ranks) for low in ranks[i+1:]]
+    offsuit = [high + low + "o" for i, high in enumerate(ranks) for low in ranks[i+1:]]
+    return pairs + suited + offsuit
+
 def gen_deck(exclude_cards=None):
     deck_ids = range(1, 53)
     if exclude_cards:
@@ -24,27 +329,420 @@ def gen_deck(exclude_cards=None):
 
 def evaluate_hand(hole_card, community_card):
     assert len(hole_card)==2 and len(community_card)==5
-    hand_info = HandEvaluator.gen_hand_rank_info(hole_card, community_card)
+    description = HandEvaluator.describe(hole_card, community_card)
     return {
-            "hand": hand_info["hand"]["strength"],
-            "strength": HandEvaluator.eval_hand(hole_card, community_card)
+            "hand": description["hand"]["strength"],
+            "strength": description["score"]
             }
 
-def _montecarlo_simulation(nb_player, hole_card, community_card):
-    community_card = _fill_community_card(community_card, used_card=hole_card+community_card)
-    unused_cards = _pick_unused_card((nb_player-1)*2, hole_card + community_card)
-    opponents_hole = [unused_cards[2*i:2*i+2] for i in range(nb_player-1)]
-    opponents_score = [HandEvaluator.eval_hand(hole, community_card) for hole in opponents_hole]
-    my_score = HandEvaluator.eval_hand(hole_card, community_card)
-    return 1 if my_score >= max(opponents_score) else 0
+CommonRunouts = namedtuple("CommonRunouts", ["nb_player", "community_ids", "picked_ids"])
+
+EquityCacheInfo = namedtuple("EquityCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# least recently used first. The lock guards lookups and updates (the app
+# serves requests from threads), the estimate itself runs outside it.
+_equity_cache = OrderedDict()
+_equity_cache_stats = { "hits": 0, "misses": 0 }
+_equity_cache_lock = threading.Lock()
+
+# (win_rate, error) of a canonical spot, error is 0.0 when enumerated
+def _cached_win_rate(nb_simulation, nb_player, hole_ids, community_ids, exact,\
+        target_error, error_scale, deadline, seed, nb_worker):
+    key = (nb_simulation, nb_player, hole_ids, community_ids, exact, target_error, error_scale, seed, nb_worker)
+    with _equity_cache_lock:
+        if key in _equity_cache:
+            _equity_cache_stats["hits"] += 1
+            _equity_cache.move_to_end(key)
+            return _equity_cache[key]
+        _equity_cache_stats["misses"] += 1
+    win_rate, error, timed_out = _estimate_win_rate(nb_simulation, nb_player, hole_ids, community_ids,\
+            exact, target_error, error_scale, deadline, seed, nb_worker)
+    if timed_out: return (win_rate, error)
+    with _equity_cache_lock:
+        _equity_cache[key] = (win_rate, error)
+        if len(_equity_cache) > EQUITY_CACHE_SIZE:
+            _equity_cache.popitem(last=False)
+    return (win_rate, error)
+
+# (win_rate, error, timed_out), timed_out is True when the deadline stopped the
+# sampling before nb_simulation runouts (or target_error) were reached
+
+def _estimate_win_rate(nb_simulation, nb_player, hole_ids, community_ids, exact,\
+        target_error, error_scale, deadline, seed, nb_worker):
+    hole_ids, community_ids = list(hole_ids), list(community_ids)
+    unused_ids = _unused_card_ids(hole_ids + community_ids)
+    if exact == "auto":
+        runout_num = _count_runouts(nb_player, len(unused_ids), 5 - len(community_ids))
+        if runout_num <= EXACT_ENUMERATION_BUDGET:
+            win_rate = _enumerate_win_rate(nb_player, hole_ids, community_ids, unused_ids, deadline)
+            if win_rate is not None: return (win_rate, 0.0, False)
+        exact = False
+    if exact:
+        return (_enumerate_win_rate(nb_player, hole_ids, community_ids, unused_ids), 0.0, False)
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    if target_error is None and deadline is None:
+        if nb_worker and nb_worker > 1:
+            win_count = _parallel_montecarlo_win_count(nb_simulation, nb_worker, seed,\
+                    nb_player, hole_ids, community_ids, unused_ids)
+        else:
+            win_count = _montecarlo_win_count(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng)
+        return (1.0 * win_count / nb_simulation, error_scale * _std_error(win_count, nb_simulation), False)
+    return _adaptive_montecarlo_win_rate(nb_simulation, nb_player, hole_ids, community_ids, unused_ids,\
+            target_error, error_scale, deadline, rng)
+
+def _adaptive_montecarlo_win_rate(nb_simulation, nb_player, hole_ids, community_ids, unused_ids,\
+        target_error, error_scale, deadline, rng=np.random):
+    win_count = simulation_count = 0
+    timed_out = False
+    while simulation_count < nb_simulation:
+        batch_size = min(ADAPTIVE_BATCH_SIZE, nb_simulation - simulation_count)
+        win_count += _montecarlo_batch(batch_size, nb_player, hole_ids, community_ids, unused_ids, rng)
+        simulation_count += batch_size
+        error = error_scale * _std_error(win_count, simulation_count)
+        if target_error is not None and error <= target_error: break
+        if deadline is not None and time.perf_counter() >= deadline:
+            timed_out = simulation_count < nb_simulation
+            break
+    return (1.0 * win_count / simulation_count, error, timed_out)
+
+# Agresti-Coull standard error (two wins and two losses added): unlike the
+# plain sqrt(p*(1-p)/n) it is not 0 when every sampled runout is a win or a
+# loss, so a lopsided first batch does not meet target_error by itself.
+def _std_error(win_count, simulation_count):
+    adjusted_count = simulation_count + 4
+    win_rate = (win_count + 2.0) / adjusted_count
+    return sqrt(win_rate * (1 - win_rate) / adjusted_count)
+
+# 0 where my_scores beats best_opponent_scores, 1 on a tie, 2 when it loses
+def _showdown_state(my_scores, best_opponent_scores):
+    return np.where(my_scores > best_opponent_scores, 0, np.where(my_scores == best_opponent_scores, 1, 2))
+
+# Score of every combo (by combo index) on community_ids, 0 for combos which
+# share a card with it. Evaluated once, so per-runout lookups are free.
+def _score_hole_combos(community_ids):
+    live_index = np.flatnonzero((_HOLE_COMBO_MASKS & gen_card_mask(community_ids)) == 0)
+    boards = np.broadcast_to(np.array(community_ids, dtype=np.intp), (len(live_index), len(community_ids)))
+    scores = np.zeros(len(_HOLE_COMBO_IDS), dtype=np.int64)
+    scores[live_index] = HandEvaluator.eval_hands_batch(_HOLE_COMBO_IDS[live_index], boards)
+    return scores
+
+# Equity of every combo against a random disjoint opponent combo on each of
+# the complete boards (rows), and whether the combo is live on that board.
+def _showdown_equities(boards):
+    board_num, combo_num = len(boards), len(_HOLE_COMBO_IDS)
+    live_flg = (_HOLE_COMBO_MASKS & _NP_CARD_BITS[boards].sum(axis=1)[:, None]) == 0
+    board_index, combo_index = np.nonzero(live_flg)
+    # dead combos get a score above every hand, so they are never lower or equal
+    scores = np.full((board_num, combo_num), _DEAD_COMBO_SCORE, dtype=np.int64)
+    scores[board_index, combo_index] = HandEvaluator.eval_hands_batch(_HOLE_COMBO_IDS[combo_index], boards[board_index])
+    lower_num, equal_num = _count_lower_equal(scores, scores, np.arange(board_num)[:, None])
+    live_num = live_flg.sum(axis=1)[:, None]
+    # the same counts among the 51 combos holding each card of the combo
+    card_scores = scores[:, _CARD_COMBO_INDEX[1:]].reshape(board_num * 52, 51)
+    card_live_num = live_flg[:, _CARD_COMBO_INDEX[1:]].sum(axis=2)
+    for card_index in (0, 1):
+        card_ids = _HOLE_COMBO_IDS[:, card_index]
+        group_index = np.arange(board_num)[:, None] * 52 + card_ids - 1
+        card_lower_num, card_equal_num = _count_lower_equal(card_scores, scores, group_index)
+        lower_num, equal_num = lower_num - card_lower_num, equal_num - card_equal_num
+        live_num = live_num - card_live_num[:, card_ids - 1]
+    # the combo itself holds both of its cards, and was taken off twice
+    equal_num, live_num = equal_num + 1, live_num + 1
+    return (lower_num + 0.5 * equal_num) / np.maximum(live_num, 1), live_flg
+
+# For each query, how many scores in row group_index of group_scores are
+# lower and equal. All rows are sorted at once, kept apart by an offset.
+def _count_lower_equal(group_scores, queries, group_index):
+    group_size = group_scores.shape[1]
+    row_offset = 2 * _DEAD_COMBO_SCORE
+    sorted_scores = np.sort(group_scores + np.arange(len(group_scores))[:, None] * row_offset, axis=None)
+    offset_queries = queries + group_index * row_offset
+    lower_num = np.searchsorted(sorted_scores, offset_queries, "left") - group_index * group_size
+    equal_num = np.searchsorted(sorted_scores, offset_queries, "right") - group_index * group_size - lower_num
+    return lower_num, equal_num
+
+def _montecarlo_win_count(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng=np.random):
+    win_count = 0
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        batch_size = min(MONTECARLO_BATCH_SIZE, nb_simulation - offset)
+        win_count += _montecarlo_batch(batch_size, nb_player, hole_ids, community_ids, unused_ids, rng)
+    return win_count
+
+# Worker i gets the i-th stream spawned from seed and an equal share of
+# nb_simulation, the partial win counts are summed.
+def _parallel_montecarlo_win_count(nb_simulation, nb_worker, seed, nb_player, hole_ids, community_ids, unused_ids):
+    seed_seqs = np.random.SeedSequence(seed).spawn(nb_worker)
+    shares = [nb_simulation // nb_worker + (1 if i < nb_simulation % nb_worker else 0) for i in range(nb_worker)]
+    with ProcessPoolExecutor(max_workers=nb_worker) as executor:
+        futures = [executor.submit(_montecarlo_worker, share, nb_player, hole_ids, community_ids, unused_ids, seed_seq)\
+                for share, seed_seq in zip(shares, seed_seqs)]
+        return sum([future.result() for future in futures])
+
+def _montecarlo_worker(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, seed_seq):
+    rng = np.random.default_rng(seed_seq)
+    return _montecarlo_win_count(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng)
+
+# Number of nb_simulation sampled runouts which hole_ids wins or ties
+def _montecarlo_batch(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng):
+    scores, _ = _sample_showdowns(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng)
+    return int(np.count_nonzero(scores[:, 0] >= scores[:, 1:].max(axis=1)))
+
+# Final scores (nb_simulation, nb_player) of nb_simulation sampled runouts,
+# player 0 holding hole_ids, and the sampled holes (nb_simulation, nb_player, 2)
+def _sample_showdowns(nb_simulation, nb_player, hole_ids, community_ids, unused_ids, rng):
+    need_num = 5 - len(community_ids)
+    picked_ids = _draw_unused_ids(rng, nb_simulation, unused_ids, need_num + (nb_player-1)*2)
+    return _score_showdowns(nb_player, hole_ids, community_ids, picked_ids)
+
+# picked_ids rows are the missing community cards followed by the opponents' holes
+def _score_showdowns(nb_player, hole_ids, community_ids, picked_ids):
+    nb_simulation, need_num = len(picked_ids), 5 - len(community_ids)
+    community = np.broadcast_to(np.array(community_ids, dtype=np.intp), (nb_simulation, len(community_ids)))
+    boards = np.hstack([community, picked_ids[:, :need_num]])
+    hole = np.broadcast_to(np.array(hole_ids, dtype=np.intp), (nb_simulation, 2))
+    holes = np.hstack([hole, picked_ids[:, need_num:]]).reshape(nb_simulation * nb_player, 2)
+    scores = HandEvaluator.eval_hands_batch(holes, np.repeat(boards, nb_player, axis=0))
+    return scores.reshape(nb_simulation, nb_player), holes.reshape(nb_simulation, nb_player, 2)
+
+# Each row is an independent uniformly ordered draw of draw_num cards from
+# unused_ids (the first draw_num steps of a Fisher-Yates shuffle per row).
+# stratified deals every pair of unused cards as the first two cards in an
+# equal share of the rows (proportional allocation), in a random order per row,
+# instead of drawing them independently, each row on its own is still a
+# uniform draw.
+# Rows are shuffled MONTECARLO_BATCH_SIZE at a time into a dtype array, so
+# only one batch of full decks is held at once.
+def _draw_unused_ids(rng, nb_simulation, unused_ids, draw_num, stratified=False, dtype=np.intp):
+    picked_ids = np.empty((nb_simulation, draw_num), dtype=dtype)
+    pair_pos = _draw_stratified_pair_pos(rng, nb_simulation, len(unused_ids)) if stratified else None
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        batch_size = min(MONTECARLO_BATCH_SIZE, nb_simulation - offset)
+        batch_pair_pos = None if pair_pos is None else pair_pos[:, offset:offset+batch_size]
+        picked_ids[offset:offset+batch_size] = _draw_unused_batch(rng, batch_size, unused_ids, draw_num, batch_pair_pos)
+    return picked_ids
+
+# (2, nb_simulation) deck positions of the stratified pair of each row, whole
+# copies of every pair and the remainder a random subset of pairs
+def _draw_stratified_pair_pos(rng, nb_simulation, unused_num):
+    first_pos, second_pos = np.triu_indices(unused_num, 1)
+    copy_num, rest_num = divmod(nb_simulation, len(first_pos))
+    pair_index = rng.permutation(np.concatenate(\
+            [np.tile(np.arange(len(first_pos)), copy_num), rng.permutation(len(first_pos))[:rest_num]]))
+    return np.stack([first_pos[pair_index], second_pos[pair_index]])
+
+def _draw_unused_batch(rng, nb_simulation, unused_ids, draw_num, pair_pos=None):
+    unused_num = len(unused_ids)
+    deck = np.tile(np.array(unused_ids, dtype=np.intp), (nb_simulation, 1))
+    rows = np.arange(nb_simulation)
+    for i in range(draw_num):
+        if pair_pos is not None and i < 2:
+            # second_pos > first_pos >= 0, so the first swap never moves the second card
+            swap_pos = pair_pos[i]
+        else:
+            swap_pos = i + (rng.random(nb_simulation) * (unused_num - i)).astype(np.intp)
+        picked = deck[rows, swap_pos]
+        deck[rows, swap_pos] = deck[:, i]
+        deck[:, i] = picked
+    if pair_pos is not None:
+        # triu_indices always puts the lower position first
+        flipped = rng.random(nb_simulation) < 0.5
+        deck[flipped, :2] = deck[flipped, 1::-1]
+    return deck[:, :draw_num]
+
+# "AsKh": one combo, "AKs"/"AKo"/"AK": a suited/offsuit/any class, "TT+":
+# pairs from TT up, "ATs+": kickers from T up to K, "A5s-A2s"/"TT-77": the
+# classes between both ends.
+def _parse_range_notation(notation):
+    combo = re.match(r"^([2-9TJQKA])([shdc])([2-9TJQKA])([shdc])$", notation)
+    if combo:
+        if combo.group(1, 2) == combo.group(3, 4): raise ValueError("invalid range notation: %s" % notation)
+        cards = [Card(_RANGE_SUIT_MAP[combo.group(i+1)], _RANGE_RANK_MAP[combo.group(i)]) for i in (1, 3)]
+        mask = np.zeros(len(_HOLE_COMBO_IDS))
+        mask[_hole_combo_index(cards)] = 1.0
+        return mask
+    span = re.match(r"^([2-9TJQKA])([2-9TJQKA])([so]?)(?:(\+)|-([2-9TJQKA])([2-9TJQKA])\3)?$", notation)
+    if not span:
+        raise ValueError("invalid range notation: %s" % notation)
+    high, low = _RANGE_RANK_MAP[span.group(1)], _RANGE_RANK_MAP[span.group(2)]
+    if high < low: high, low = low, high
+    suited = span.group(3)
+    if high == low:
+        if suited: raise ValueError("invalid range notation: %s" % notation)
+        last = 14 if span.group(4) else _RANGE_RANK_MAP[span.group(5) or span.group(1)]
+        if span.group(6) and span.group(5) != span.group(6):
+            raise ValueError("invalid range notation: %s" % notation)
+        pair_ranks = range(min(high, last), max(high, last) + 1)
+        return np.isin(_HOLE_COMBO_HIGH_RANK, pair_ranks) & (_HOLE_COMBO_HIGH_RANK == _HOLE_COMBO_LOW_RANK)
+    if span.group(4):
+        low_ranks = range(low, high)
+    elif span.group(5):
+        if _RANGE_RANK_MAP[span.group(5)] != high: raise ValueError("invalid range notation: %s" % notation)
+        last = _RANGE_RANK_MAP[span.group(6)]
+        low_ranks = range(min(low, last), max(low, last) + 1)
+    else:
+        low_ranks = [low]
+    mask = (_HOLE_COMBO_HIGH_RANK == high) & np.isin(_HOLE_COMBO_LOW_RANK, low_ranks)
+    if suited: mask &= _HOLE_COMBO_SUITED == (suited == "s")
+    return mask
+
+def _hole_combo_index(hole):
+    hole_ids = tuple(sorted([(Card.from_str(card) if isinstance(card, str) else card).to_id() for card in hole]))
+    if hole_ids not in _HOLE_COMBO_INDEX:
+        raise ValueError("invalid hole: %s" % [str(Card.from_id(card_id)) for card_id in hole_ids])
+    return _HOLE_COMBO_INDEX[hole_ids]
+
+def _enumerate_range_equity(weights, community_ids, unused_ids):
+    live = [np.flatnonzero(weight) for weight in weights]
+    combos = [_HOLE_COMBO_IDS[combo_indexes] for combo_indexes in live]
+    masks = [_HOLE_COMBO_MASKS[combo_indexes] for combo_indexes in live]
+    pair_weights = np.outer(weights[0][live[0]], weights[1][live[1]]) * ((masks[0][:, None] & masks[1]) == 0)
+    if not pair_weights.sum() > 0:
+        raise ValueError("the ranges have no combos without a shared card")
+    need_num = 5 - len(community_ids)
+    runouts = np.array(list(combinations(unused_ids, need_num)), dtype=np.intp)\
+            .reshape(comb(len(unused_ids), need_num), need_num)
+    chunk_size = max(1, RANGE_CHUNK_SIZE // pair_weights.size)
+    share_sum = weight_sum = 0.0
+    for offset in range(0, len(runouts), chunk_size):
+        chunk = runouts[offset:offset+chunk_size]
+        boards = np.hstack([np.broadcast_to(np.array(community_ids, dtype=np.intp), (len(chunk), len(community_ids))), chunk])
+        runout_masks = _NP_CARD_BITS[chunk].sum(axis=1)
+        live_flgs = [(mask & runout_masks[:, None]) == 0 for mask in masks]
+        scores = [_score_live_combos(combo, boards, live_flg) for combo, live_flg in zip(combos, live_flgs)]
+        deal_weights = pair_weights * live_flgs[0][:, :, None] * live_flgs[1][:, None, :]
+        shares = (scores[0][:, :, None] > scores[1][:, None, :]) + 0.5 * (scores[0][:, :, None] == scores[1][:, None, :])
+        share_sum += float((deal_weights * shares).sum())
+        weight_sum += float(deal_weights.sum())
+    equity = share_sum / weight_sum
+    return [equity, 1.0 - equity]
+
+# scores[i, j] of combos[j] on boards[i], left at 0 where live_flg is False
+# (the combo shares a card with the board)
+def _score_live_combos(combos, boards, live_flg):
+    board_index, combo_index = np.nonzero(live_flg)
+    scores = np.zeros(live_flg.shape, dtype=np.int64)
+    scores[board_index, combo_index] = HandEvaluator.eval_hands_batch(combos[combo_index], boards[board_index])
+    return scores
+
+def _montecarlo_range_equity(nb_simulation, weights, community_ids, unused_ids, rng):
+    share_sums = np.zeros(len(weights))
+    for offset in range(0, nb_simulation, MONTECARLO_BATCH_SIZE):
+        batch_size = min(MONTECARLO_BATCH_SIZE, nb_simulation - offset)
+        share_sums += _montecarlo_range_batch(batch_size, weights, community_ids, unused_ids, rng)
+    return [float(share_sum) / nb_simulation for share_sum in share_sums]
+
+def _montecarlo_range_batch(nb_simulation, weights, community_ids, unused_ids, rng):
+    deals = _draw_disjoint_combos(rng, nb_simulation, weights)
+    holes = _HOLE_COMBO_IDS[deals]
+    need_num, nb_range = 5 - len(community_ids), len(weights)
+    # the first need_num cards of a uniformly ordered draw that are not in
+    # the dealt combos are a uniform runout from the rest of the deck
+    picked_ids = _draw_unused_ids(rng, nb_simulation, unused_ids, need_num + 2*nb_range)
+    dead_flg = (picked_ids[:, :, None] == holes.reshape(nb_simulation, 1, 2*nb_range)).any(axis=2)
+    live_order = np.argsort(dead_flg, axis=1, kind="stable")[:, :need_num]
+    community = np.broadcast_to(np.array(community_ids, dtype=np.intp), (nb_simulation, len(community_ids)))
+    boards = np.hstack([community, np.take_along_axis(picked_ids, live_order, axis=1)])
+    scores = HandEvaluator.eval_hands_batch(holes.reshape(-1, 2), np.repeat(boards, nb_range, axis=0))
+    winner_flg = scores.reshape(nb_simulation, nb_range) == scores.reshape(nb_simulation, nb_range).max(axis=1, keepdims=True)
+    return (winner_flg / winner_flg.sum(axis=1, keepdims=True)).sum(axis=0)
+
+# nb_simulation rows of one combo index per range, drawn by weight and
+# rejected until the combos in a row share no card
+def _draw_disjoint_combos(rng, nb_simulation, weights):
+    probabilities = [weight / weight.sum() for weight in weights]
+    deals, deal_num = [], 0
+    for _ in range(RANGE_MAX_DRAW_ROUNDS):
+        draw = np.stack([rng.choice(len(_HOLE_COMBO_IDS), size=nb_simulation, p=p) for p in probabilities], axis=1)
+        masks = _HOLE_COMBO_MASKS[draw]
+        draw = draw[np.bitwise_or.reduce(masks, axis=1) == masks.sum(axis=1)]
+        deals.append(draw)
+        deal_num += len(draw)
+        if deal_num >= nb_simulation:
+            return np.vstack(deals)[:nb_simulation]
+    raise ValueError("the ranges have (almost) no combos without a shared card")
+
+def _preflop_hand_class(hole_card):
+    high, low = sorted([card.rank for card in hole_card], reverse=True)
+    suffix = "" if high == low else "s" if hole_card[0].suit == hole_card[1].suit else "o"
+    return Card.RANK_MAP[high] + Card.RANK_MAP[low] + suffix
+
+# (win_rate, std_error) from the preflop equity table, None if it has no entry
+def _fetch_preflop_equity(nb_player, hole_card):
+    table = _load_preflop_equity_table()
+    equities = table["equity"].get(_preflop_hand_class(hole_card))
+    if not equities or not 2 <= nb_player <= len(equities)+1: return None
+    win_rate = equities[nb_player-2]
+    return (win_rate, sqrt(win_rate * (1 - win_rate) / table["nb_simulation"]))
+
+@lru_cache(maxsize=None)
+def _load_preflop_equity_table():
+    if not os.path.exists(PREFLOP_EQUITY_PATH): return { "nb_simulation": 0, "equity": {} }
+    with open(PREFLOP_EQUITY_PATH, "r") as f:
+        return json.load(f)
+
+def _count_runouts(nb_player, unused_num, need_num):
+    runout_num = comb(unused_num, need_num)
+    for i in range(nb_player-1):
+        runout_num *= comb(unused_num - need_num - 2*i, 2)
+    return runout_num
+
+# None if the deadline passes before every runout is scored
+def _enumerate_win_rate(nb_player, hole_ids, community_ids, unused_ids, deadline=None):
+    need_num = 5 - len(community_ids)
+    win_count = 0
+    for picked_ids in combinations(unused_ids, need_num):
+        if deadline is not None and time.perf_counter() >= deadline: return None
+        board = BoardEvaluator.from_ids(community_ids + list(picked_ids))
+        my_score = board.eval_hand_ids(hole_ids)
+        rest_ids = [card_id for card_id in unused_ids if card_id not in picked_ids]
+        losing_holes = [hole for hole in combinations(rest_ids, 2) if board.eval_hand_ids(hole) <= my_score]
+        if nb_player == 2:
+            win_count += len(losing_holes)
+        else:
+            hole_masks = [gen_card_mask(hole) for hole in losing_holes]
+            win_count += _count_disjoint_holes(hole_masks, 0, nb_player-1)
+    return 1.0 * win_count / _count_runouts(nb_player, len(unused_ids), need_num)
+
+# number of ordered ways to seat nb_opponent opponents on disjoint hole_masks
+def _count_disjoint_holes(hole_masks, used_mask, nb_opponent):
+    if nb_opponent == 0: return 1
+    return sum([_count_disjoint_holes(hole_masks, used_mask | mask, nb_opponent-1)\
+            for mask in hole_masks if not mask & used_mask])
+
+# card id -> card id with the suits permuted, one table per permutation
+def _gen_suit_permutation_tables():
+    tables = []
+    for perm in permutations(range(4)):
+        table = [None] * 53
+        for card_id in range(1, 53):
+            table[card_id] = (card_id-1) % 13 + 1 + 13 * perm[(card_id-1) // 13]
+        tables.append(table)
+    return tables
+
+_SUIT_PERMUTATION_TABLES = _gen_suit_permutation_tables()
 
-def _fill_community_card(base_cards, used_card):
-    need_num = 5 - len(base_cards)
-    return base_cards + _pick_unused_card(need_num, used_card)
+_HOLE_COMBO_IDS = np.array(list(combinations(range(1, 53), 2)), dtype=np.intp)
+_HOLE_COMBO_INDEX = { tuple(combo): i for i, combo in enumerate(_HOLE_COMBO_IDS.tolist()) }
+# card id -> bit of the card in gen_card_mask, and the mask of every combo
+_NP_CARD_BITS = np.array([0] + [1 << (card_id - 1) for card_id in range(1, 53)], dtype=np.int64)
+_HOLE_COMBO_MASKS = _NP_CARD_BITS[_HOLE_COMBO_IDS].sum(axis=1)
+# (card id, card id) in either order -> combo index
+_NP_COMBO_INDEX = np.zeros((53, 53), dtype=np.intp)
+_NP_COMBO_INDEX[_HOLE_COMBO_IDS[:, 0], _HOLE_COMBO_IDS[:, 1]] = np.arange(len(_HOLE_COMBO_IDS))
+_NP_COMBO_INDEX[_HOLE_COMBO_IDS[:, 1], _HOLE_COMBO_IDS[:, 0]] = np.arange(len(_HOLE_COMBO_IDS))
+# card id -> the 51 combo indexes holding that card
+_CARD_COMBO_INDEX = np.array([np.zeros(51, dtype=np.intp)] +\
+        [np.flatnonzero((_HOLE_COMBO_IDS == card_id).any(axis=1)) for card_id in range(1, 53)])
+_DEAD_COMBO_SCORE = 1 << 30
+_HOLE_COMBO_CARDS = [[Card.from_id(card_id) for card_id in combo] for combo in _HOLE_COMBO_IDS.tolist()]
+_HOLE_COMBO_HIGH_RANK = np.array([max(a.rank, b.rank) for a, b in _HOLE_COMBO_CARDS])
+_HOLE_COMBO_LOW_RANK = np.array([min(a.rank, b.rank) for a, b in _HOLE_COMBO_CARDS])
+_HOLE_COMBO_SUITED = np.array([a.suit == b.suit for a, b in _HOLE_COMBO_CARDS])
 
-def _pick_unused_card(card_num, used_card):
-    used = [card.to_id() for card in used_card]
-    unused = [card_id for card_id in range(1, 53) if card_id not in used]
-    choiced = random.sample(unused, card_num)
-    return [Card.from_id(card_id) for card_id in choiced]
+# range notation writes cards rank first with lower case suits ("AsKh")
+_RANGE_RANK_MAP = { v: k for k, v in Card.RANK_MAP.items() }
+_RANGE_SUIT_MAP = { v.lower(): k for k, v in Card.SUIT_MAP.items() }
 
+def _unused_card_ids(used_ids):
+    used = set(used_ids)
+    return [card_id for card_id in range(1, 53) if card_id not in used]
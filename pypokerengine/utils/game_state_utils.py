@@ -50,7 +50,7 @@ def replace_community_card(game_state, community_card):
     return deepcopy
 
 def deepcopy_game_state(game_state):
-    tabledeepcopy = Table.deserialize(game_state["table"].serialize())
+    tabledeepcopy = game_state["table"].copy()
     return {
             "round_count": game_state["round_count"],
             "small_blind_amount": game_state["small_blind_amount"],
@@ -81,17 +81,15 @@ def _restore_community_card_on_table(table, card_data):
         table.add_community_card(Card.from_str(str_card))
 
 def _restore_deck(str_exclude_cards):
-    deck = Deck()
     exclude_ids = [Card.to_id(Card.from_str(s)) for s in str_exclude_cards]
-    deck_cards = [Card.from_id(cid) for cid in range(1, 53) if cid not in exclude_ids]
-    deck.deck = deck_cards
-    return deck
+    return Deck([cid for cid in range(1, 53) if cid not in exclude_ids])
 
 def _restore_seats(seats_info, action_histories):
     players = [Player(info["uuid"], info["stack"], info["name"]) for info in seats_info]
     players_state = [info["state"] for info in seats_info]
     _restore_action_histories_on_players(players, action_histories)
     _restore_pay_info_on_players(players, players_state, action_histories)
+    for player in players: player.sync_betting_state()
     seats = Seats()
     seats.players = players
     return seats
@@ -105,15 +103,13 @@ def _restore_action_histories_on_players(players, round_action_histories):
     for street_name in past_street_names:
         street_flg = _street_flg_translator[street_name]
         action_histories = round_action_histories[street_name]
-        for player in players: player.round_action_histories[street_flg] = []
-        for action_history in action_histories:
-            player = _find_user_by_uuid(players, action_history["uuid"])
-            player.round_action_histories[street_flg].append(action_history)
+        for player in players:
+            player.restore_action_histories(_filter_by_uuid(action_histories, player.uuid), street_flg)
 
     # resotre action_histories
-    for action_history in round_action_histories[current_street_name]:
-        player = _find_user_by_uuid(players, action_history["uuid"])
-        player.action_histories.append(action_history)
+    for player in players:
+        action_histories = round_action_histories[current_street_name]
+        player.restore_action_histories(_filter_by_uuid(action_histories, player.uuid))
 
 def _restore_pay_info_on_players(players, players_state, round_action_histories):
     _restore_pay_info_status_on_players(players, players_state)
@@ -126,6 +122,9 @@ def _restore_pay_info_amount_on_players(players, round_action_histories):
         player = _find_user_by_uuid(players, action_history["uuid"])
         player.pay_info.amount += _fetch_pay_amount(action_history)
 
+def _filter_by_uuid(action_histories, uuid):
+    return [history for history in action_histories if history["uuid"]==uuid]
+
 def _find_user_by_uuid(players, uuid):
     return [player for player in players if player.uuid==uuid][0]
 
@@ -0,0 +1,105 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from math import sqrt
+
+import numpy as np
+import pytest
+
+from pypokerengine.engine.card import Card
+from pypokerengine.utils.card_utils import MONTECARLO_BATCH_SIZE, gen_cards, estimate_hole_card_win_rate,\
+        gen_common_runouts, estimate_win_rate_on_runouts, estimate_board_equities,\
+        gen_range, gen_range_mask, gen_hole_combos, clear_equity_cache, equity_cache_info,\
+        _replace_blocked_ids, _HOLE_COMBO_INDEX
+
+# Our hole cards are often dealt on the board here, which used to shift the
+# stratified pair onto the board (z about -3.4 on these runouts)
+def test_stratified_runouts_match_exact_equity():
+    hole_card, community_card = gen_cards(["H2", "H3"]), gen_cards(["HA", "HK", "S4"])
+    exact = estimate_hole_card_win_rate(1, 2, hole_card, community_card, exact=True)
+    nb_simulation = 400000
+    runouts = gen_common_runouts(nb_simulation, 2, community_card, seed=11, stratified=True)
+    win_rate = estimate_win_rate_on_runouts(runouts, hole_card)
+    assert abs(win_rate - exact) < 3 * sqrt(exact * (1 - exact) / nb_simulation)
+
+def test_stratified_pair_order_is_random():
+    runouts = gen_common_runouts(10000, 2, gen_cards(["HA", "HK", "S4"]), seed=0, stratified=True)
+    first_lower = np.mean(runouts.picked_ids[:, 2] < runouts.picked_ids[:, 3])
+    assert 0.45 < first_lower < 0.55
+
+def test_blocked_cards_are_replaced_in_place():
+    picked_ids = np.array([[5, 1, 7, 8, 9, 10, 2, 3], [4, 5, 6, 7, 8, 9, 2, 10]])
+    replaced = _replace_blocked_ids(picked_ids, [1, 2])
+    assert replaced.tolist() == [[5, 3, 7, 8, 9, 10], [4, 5, 6, 7, 8, 9]]
+
+def test_preflop_seed_runs_its_own_simulation():
+    hole_card = gen_cards(["SA", "HK"])
+    table_rate = estimate_hole_card_win_rate(1000, 2, hole_card)
+    seeded_rate = estimate_hole_card_win_rate(1000, 2, hole_card, seed=5)
+    assert seeded_rate == estimate_hole_card_win_rate(1000, 2, hole_card, seed=5)
+    assert seeded_rate != table_rate
+    assert abs(seeded_rate - table_rate) < 0.1
+    # the table's error (about 0.0005) would meet the target without sampling
+    _, error = estimate_hole_card_win_rate(2000, 2, hole_card, target_error=0.02)
+    assert 0.01 < error <= 0.02
+
+def test_common_runouts_are_drawn_in_batches():
+    community_card = gen_cards(["HA", "HK", "S4"])
+    nb_simulation = MONTECARLO_BATCH_SIZE + 1176
+    picked_ids = gen_common_runouts(nb_simulation, 2, community_card, seed=0, stratified=True).picked_ids
+    assert picked_ids.dtype == np.uint8 and picked_ids.shape == (nb_simulation, 6)
+    assert (np.sort(picked_ids, axis=1)[:, 1:] != np.sort(picked_ids, axis=1)[:, :-1]).all()
+    assert not np.isin(picked_ids, [card.to_id() for card in community_card]).any()
+    # 1176 pairs of the 49 unused cards, dealt to the opponent equally often (up
+    # to the remainder)
+    pair_counts = np.unique(np.sort(picked_ids[:, 2:4], axis=1), axis=0, return_counts=True)[1]
+    assert len(pair_counts) == 1176 and pair_counts.max() - pair_counts.min() <= 1
+
+def test_board_equities_take_nb_simulation_first():
+    equities = estimate_board_equities(400, seed=1)
+    aces = _HOLE_COMBO_INDEX[(1, 14)]
+    assert equities.shape == (1326,) and 0.8 < equities[aces] < 0.9
+    # the 46 turn runouts are enumerated whatever nb_simulation is
+    turn_card = gen_cards(["HA", "HK", "S4", "D9"])
+    turn_equities = estimate_board_equities(1, turn_card)
+    np.testing.assert_array_equal(turn_equities, estimate_board_equities(5000, turn_card))
+    assert np.isnan(turn_equities[_HOLE_COMBO_INDEX[(1, 27)]])
+
+def range_combos(range_str):
+    combos = np.array(gen_hole_combos())[gen_range_mask(range_str)]
+    return set([tuple(sorted(str(Card.from_id(card_id)) for card_id in combo)) for combo in combos.tolist()])
+
+def test_parse_pairs():
+    assert range_combos("AA") == set([("CA", "DA"), ("CA", "HA"), ("CA", "SA"), ("DA", "HA"), ("DA", "SA"), ("HA", "SA")])
+    assert len(range_combos("TT+")) == 5 * 6
+    assert range_combos("TT-77") == range_combos("77, 88, 99, TT")
+
+def test_parse_suited_and_offsuit():
+    assert range_combos("AKs") == set([("CA", "CK"), ("DA", "DK"), ("HA", "HK"), ("SA", "SK")])
+    assert len(range_combos("AKo")) == 12
+    assert range_combos("AK") == range_combos("AKs") | range_combos("AKo")
+
+def test_parse_plus_and_dash_ranges():
+    assert range_combos("ATs+") == range_combos("ATs, AJs, AQs, AKs")
+    assert range_combos("A5s-A2s") == range_combos("A2s, A3s, A4s, A5s")
+    assert range_combos("K9o-KJo") == range_combos("K9o, KTo, KJo")
+
+def test_parse_explicit_combos_and_weights():
+    assert range_combos("AsKh") == set([("HK", "SA")])
+    weights = gen_range("AsKh:0.5, AK")
+    assert weights[_HOLE_COMBO_INDEX[(1, 39)]] == 1.0 and weights.sum() == 16
+
+@pytest.mark.parametrize("token", ["AsAs", "Xx", "AsK", "AA+s", "AKs-A2o", "AK-QJ", "KK-QQs", "AAs"])
+def test_parse_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError, match=re.escape(token)):
+        gen_range("QQ, %s" % token)
+
+def test_equity_cache_is_shared_between_threads():
+    clear_equity_cache()
+    spots = [gen_cards(board) for board in [["D2", "C7", "H9", "S4"], ["DK", "CQ", "H9", "S2"], ["HQ", "HJ", "S4", "C5"]]]
+    def estimate(i):
+        return estimate_hole_card_win_rate(1000, 2, gen_cards(["SA", "HK"]), spots[i % 3], exact=True)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        win_rates = list(executor.map(estimate, range(48)))
+    assert win_rates == [estimate(i) for i in range(48)]
+    info = equity_cache_info()
+    assert info.currsize == 3 and info.hits + info.misses == 96
@@ -0,0 +1,32 @@
+from pypokerengine.api.emulator import Emulator, Event
+from pypokerengine.engine.message_builder import MessageBuilder
+from pypokerengine.players import BasePokerPlayer
+
+class CallPlayer(BasePokerPlayer):
+
+    def declare_action(self, valid_actions, hole_card, round_state):
+        return "call"
+
+def setup_emulator():
+    emulator = Emulator()
+    emulator.set_game_rule(2, 1, 5, 0)
+    players_info = {}
+    for uuid in ["uuid0", "uuid1"]:
+        player = CallPlayer()
+        player.set_uuid(uuid)
+        emulator.register_player(uuid, player)
+        players_info[uuid] = { "name": uuid, "stack": 100 }
+    state, _ = emulator.start_new_round(emulator.generate_initial_game_state(players_info))
+    return emulator, state
+
+def test_run_until_round_finish_returns_events():
+    emulator, state = setup_emulator()
+    state, events = emulator.run_until_round_finish(state)
+    assert Event.ROUND_FINISH in [event["type"] for event in events]
+    assert events[-1]["type"] == Event.GAME_FINISH
+
+def test_ask_message_action_histories_are_not_shared():
+    _, state = setup_emulator()
+    message = MessageBuilder.build_ask_message(state["next_player"], state)["message"]
+    message["action_histories"]["action_histories"]["preflop"][0]["amount"] = 0
+    assert message["round_state"]["action_histories"]["preflop"][0]["amount"] == 5
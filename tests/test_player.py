@@ -0,0 +1,34 @@
+from pypokerengine.engine.player import Player
+from pypokerengine.engine.poker_constants import PokerConstants as Const
+
+def test_fractional_blinds_are_logged():
+    player = Player("uuid", 100)
+    player.add_action_history(Const.Action.SMALL_BLIND, sb_amount=2.5)
+    player.add_action_history(Const.Action.RAISE, 10, 5)
+    assert player.action_histories == [
+        { "action": "SMALLBLIND", "amount": 2.5, "add_amount": 2.5, "uuid": "uuid" },
+        { "action": "RAISE", "amount": 10, "paid": 7.5, "add_amount": 5, "uuid": "uuid" }
+    ]
+    assert player.street_raise == (10, 5)
+
+# dict equality treats 1 and 1.0 alike, so the reprs are compared to check
+# that earlier integer amounts stay ints
+def test_fractional_amount_keeps_earlier_entries_types():
+    player = Player("uuid", 100)
+    player.add_action_history(Const.Action.ANTE, 1)
+    player.add_action_history(Const.Action.BIG_BLIND, sb_amount=5)
+    before = repr(player.action_histories)
+    player.add_action_history(Const.Action.RAISE, 12.5, 2.5)
+    assert repr(player.action_histories[:2]) == before
+    assert repr(player.action_histories[2]) == repr(
+        { "action": "RAISE", "amount": 12.5, "paid": 2.5, "add_amount": 2.5, "uuid": "uuid" })
+
+def test_serialize_round_trip_keeps_the_log():
+    player = Player("uuid", 100)
+    player.add_action_history(Const.Action.BIG_BLIND, sb_amount=5)
+    player.save_street_action_histories(Const.Street.PREFLOP)
+    player.add_action_history(Const.Action.CALL, 1.5)
+    restored = Player.deserialize(player.serialize())
+    assert restored.round_action_histories == player.round_action_histories
+    assert restored.action_histories == player.action_histories
+    assert restored.paid_sum() == 1.5
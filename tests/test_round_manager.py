@@ -0,0 +1,33 @@
+from pypokerengine.engine.table import Table
+from pypokerengine.engine.player import Player
+from pypokerengine.engine.round_manager import RoundManager
+from pypokerengine.engine.poker_constants import PokerConstants as Const
+from pypokerengine.utils.game_state_utils import deepcopy_game_state
+
+def setup_state(nb_player=2):
+    table = Table()
+    for i in range(nb_player):
+        table.seats.sitdown(Player("uuid%d" % i, 100, "p%d" % i))
+    table.set_blind_pos(0, 1)
+    state, _ = RoundManager.start_new_round(1, 5, 0, table)
+    return deepcopy_game_state(state)
+
+def test_undo_across_street_keeps_copies_intact():
+    state = setup_state()
+    RoundManager.apply_action_inplace(state, "call")
+    token = RoundManager.apply_action_inplace(state, "call")
+    assert state["street"] == Const.Street.FLOP
+    copied = deepcopy_game_state(state)
+    expected = copied["table"].serialize()
+    RoundManager.undo(state, token)
+    RoundManager.apply_action_inplace(state, "raise")
+    assert copied["table"].serialize() == expected
+
+def test_undo_restores_applied_actions():
+    state = setup_state(3)
+    expected = state["table"].serialize()
+    tokens = [RoundManager.apply_action_inplace(state, action) for action in ["call", "raise", "call", "call"]]
+    for token in reversed(tokens):
+        RoundManager.undo(state, token)
+    assert state["table"].serialize() == expected
+    assert (state["street"], state["next_player"]) == (Const.Street.PREFLOP, 2)